@@ -1,5 +1,13 @@
 import streamlit as st
 
+from mms_runtime import get_mms_runtime
+from mms_server import get_mms_client
+
+# Warm up the MMS model in the background as soon as the hub first renders,
+# unless a shared MMS server does the inference
+if get_mms_client() is None:
+    get_mms_runtime()
+
 st.set_page_config(
     page_title="AI Voice Tools",
     page_icon="🎙️",
@@ -1,219 +1,408 @@
 import streamlit as st
 import openai
-import os
-import base64
-from tempfile import NamedTemporaryFile
-from transformers import VitsModel, AutoTokenizer
-import torch
-import numpy as np
-import scipy.io.wavfile as wav
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from audio_download import (
+    forget_audio,
+    remember_audio,
+    render_audio,
+    render_remembered_audio,
+)
+from audio_codecs import DEFAULT_CODEC, OPENAI_RESPONSE_FORMATS, available_codecs
+from audio_post import postprocess
+from audio_result import AudioResult
+from http_client import get_http_client
+from singleflight import get_singleflight
+from tracing import get_tracer, start_metrics_server
+from tts_cache import get_audio_cache
+from mms_batcher import get_batcher
+from mms_runtime import get_mms_runtime
+from mms_server import get_mms_client
+from streaming_tts import OPENAI_PCM_SAMPLE_RATE, crossfade_concat, to_wav_bytes
+from tts_registry import PRESET_PROMPTS, VOICE_OPTIONS, run_sync, stream_sync, synthesize_sync
+from tts_router import LATENCY_TARGET, RoutingError, get_router
+from tts_engine import OUTPUT_SAMPLE_RATE, TTSError, mms_synthesizer
 
-def get_binary_file_downloader_html(bin_file, file_label='File'):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    b64 = base64.b64encode(data).decode()
-    return f'<a href="data:application/octet-stream;base64,{b64}" download="{file_label}">Download {file_label}</a>'
-
-def openai_tts(text, voice="nova"):
-    """Convert text to speech using OpenAI's basic TTS API"""
+def play_stream(label, chunks, sample_rate, download_filename):
+    """Play synthesized chunks as they arrive, then offer and return the stitched audio"""
     try:
-        response = openai.audio.speech.create(
-            model="tts-1",
-            voice=voice,
-            input=text
+        start = time.perf_counter()
+        status = st.empty()
+        segments = st.container()
+        waveforms = []
+        for i, waveform in enumerate(chunks):
+            if i == 0:
+                first_audio = time.perf_counter() - start
+            waveforms.append(waveform)
+            status.caption(f"Streaming segment {i + 1} · first audio after {first_audio:.2f}s")
+            with segments:
+                st.audio(to_wav_bytes(waveform, sample_rate), format='audio/wav', autoplay=(i == 0))
+        if not waveforms:
+            return None
+
+        status.caption(
+            f"{len(waveforms)} segments · first audio after {first_audio:.2f}s · "
+            f"total {time.perf_counter() - start:.2f}s"
         )
-        
-        with NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-            response.stream_to_file(fp.name)
-            return fp.name
+        # The stitched file gets the same trimming and loudness normalization as MMS output
+        samples, rate = postprocess(crossfade_concat(waveforms, sample_rate), sample_rate,
+                                    target_rate=OUTPUT_SAMPLE_RATE)
+        full_audio = AudioResult(to_wav_bytes(samples, rate), rate, "wav")
+        render_audio(full_audio, download_filename)
+        return full_audio
     except Exception as e:
-        st.error(f"Error generating speech with OpenAI TTS: {str(e)}")
+        st.error(f"Error streaming speech with {label}: {str(e)}")
         return None
 
-def openai_chat_tts(text, system_prompt):
-    """Convert text to speech using OpenAI's Chat Completions TTS"""
+def run_in_slot(ctx, slot, synthesize):
+    """Run a synthesis call on a worker thread, routing its messages to slot"""
+    add_script_run_ctx(threading.current_thread(), ctx)
+    start = time.perf_counter()
+    with slot:
+        try:
+            result = synthesize()
+        except TTSError as e:
+            st.error(str(e))
+            result = None
+    return result, time.perf_counter() - start
+
+def stream_in_slot(ctx, slot, label, make_stream, get_sample_rate, download_filename):
+    """Play a synthesis stream on a worker thread, routing its messages to slot
+
+    The sample rate is resolved here too, so waiting for the MMS model does
+    not hold up the other backends.
+    """
+    add_script_run_ctx(threading.current_thread(), ctx)
+    with slot:
+        try:
+            sample_rate = get_sample_rate()
+        except TTSError as e:
+            st.error(str(e))
+            return None
+        return play_stream(label, make_stream(), sample_rate, download_filename)
+
+def auto_tts(text, latency_target, options, decisions):
+    """Synthesize with the backend the router picks, keeping its decision for display"""
     try:
-        completion = openai.chat.completions.create(
-            model="gpt-4o-audio-preview",
-            modalities=["text", "audio"],
-            audio={"voice": "alloy", "format": "mp3"},
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_prompt,
-                },
-                {
-                    "role": "user",
-                    "content": text,
-                }
-            ],
+        # The shared loop lets a hedged-out call finish in the background
+        audio, decision = run_sync(get_router().route(text, latency_target=latency_target, options=options))
+    except RoutingError as e:
+        decisions.append(e.decision)
+        raise
+    decisions.append(decision)
+    return audio
+
+def main():
+    """Render the Hebrew TTS comparison page"""
+    # Set page configuration
+    st.set_page_config(
+        page_title="Hebrew Text-to-Speech Comparison",
+        page_icon="🗣️",
+    )
+
+    # Set OpenAI API key
+    if 'OPENAI_API_KEY' not in st.secrets:
+        st.error("OpenAI API key not found in secrets!")
+        st.stop()
+    else:
+        openai.api_key = st.secrets['OPENAI_API_KEY']
+
+    # Start loading the MMS model in the background; requests only wait for it if
+    # they need MMS before the load has finished. With an MMS server configured,
+    # this process does not load the model at all.
+    mms_client = get_mms_client()
+    mms_runtime = get_mms_runtime() if mms_client is None else None
+    audio_cache = get_audio_cache()
+    metrics_port = start_metrics_server()
+
+    # Main app
+    st.title("Hebrew Text-to-Speech Comparison")
+    st.write("Compare different TTS models for Hebrew text")
+
+    # Model selection
+    model_choice = st.radio(
+        "Choose TTS Model(s)",
+        ["OpenAI TTS", "OpenAI Chat TTS", "MMS-TTS", "Compare All", "Auto"],
+        horizontal=True
+    )
+
+    # OpenAI voice selection (only show if OpenAI TTS is selected)
+    if model_choice in ["OpenAI TTS", "Compare All", "Auto"]:
+        st.subheader("OpenAI TTS Settings")
+        voice_options = VOICE_OPTIONS
+        selected_voice = st.selectbox("Select OpenAI voice:", list(voice_options.keys()))
+
+    # Chat TTS settings (only show if Chat TTS is selected)
+    if model_choice in ["OpenAI Chat TTS", "Compare All", "Auto"]:
+        st.subheader("OpenAI Chat TTS Settings")
+        preset_prompts = PRESET_PROMPTS
+        selected_prompt = st.selectbox("Select speaking style:", list(preset_prompts.keys()))
+
+        if selected_prompt == "Custom":
+            system_prompt = st.text_area("Enter custom system prompt:", 
+                                       height=100,
+                                       help="Describe how you want the assistant to speak")
+        else:
+            system_prompt = preset_prompts[selected_prompt]
+
+    # Auto routing settings
+    if model_choice == "Auto":
+        st.subheader("Auto Routing")
+        latency_target = st.number_input(
+            "Latency target (seconds)", min_value=0.5, max_value=30.0, value=LATENCY_TARGET, step=0.5,
+            help="Each request goes to the backend most likely to finish within this time; a slow call "
+                 "is raced against a second backend, and local MMS-TTS takes over when the network fails"
         )
-        
-        # Decode and save the audio
-        with NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-            mp3_bytes = base64.b64decode(completion.choices[0].message.audio.data)
-            fp.write(mp3_bytes)
-            return fp.name
-    except Exception as e:
-        st.error(f"Error generating speech with OpenAI Chat TTS: {str(e)}")
-        return None
 
-@st.cache_resource
-def load_mms_model():
-    """Load the MMS-TTS model"""
-    try:
-        model = VitsModel.from_pretrained("facebook/mms-tts-heb")
-        tokenizer = AutoTokenizer.from_pretrained("facebook/mms-tts-heb")
-        return model, tokenizer
-    except Exception as e:
-        st.error(f"Error loading MMS model: {str(e)}")
-        return None, None
+    # Text input
+    text_input = st.text_area("Enter Hebrew text:", value="שלום עולם", height=150)
 
-def mms_tts(text, model, tokenizer):
-    """Convert text to speech using MMS-TTS"""
-    try:
-        # Tokenize the text
-        inputs = tokenizer(text=text, return_tensors="pt")
-        
-        # Generate speech with torch.no_grad()
-        with torch.no_grad():
-            # The VITS model outputs a dictionary with 'waveform' key
-            output = model(**inputs)
-            waveform = output.waveform[0]  # Get the first waveform from batch
-        
-        # Save the audio to a temporary file
-        with NamedTemporaryFile(delete=False, suffix=".wav") as fp:
-            # Convert to numpy array and scale to int16 range
-            audio_np = waveform.numpy()
-            audio_np = np.int16(audio_np * 32767)
-            wav.write(fp.name, model.config.sampling_rate, audio_np)
-            return fp.name
-    except Exception as e:
-        st.error(f"Error generating speech with MMS-TTS: {str(e)}")
-        return None
+    # Streaming applies to the engines that synthesize text directly
+    stream_output = False
+    if model_choice in ["OpenAI TTS", "MMS-TTS", "Compare All"]:
+        stream_output = st.checkbox(
+            "Stream long text sentence by sentence",
+            help="Start playback after the first sentence and stitch the full file at the end (OpenAI TTS and MMS-TTS)"
+        )
 
-# Set page configuration
-st.set_page_config(
-    page_title="Hebrew Text-to-Speech Comparison",
-    page_icon="🗣️",
-)
+    # Audio cache settings
+    with st.sidebar:
+        st.subheader("Audio Cache")
+        use_cache = st.checkbox("Reuse cached audio", value=True,
+                                help="Serve identical requests from the local audio cache")
+        cache_stats = audio_cache.stats()
+        st.caption(
+            f"Hits: {cache_stats['memory_hits'] + cache_stats['disk_hits']} · "
+            f"Misses: {cache_stats['misses']} · "
+            f"Hit rate: {cache_stats['hit_rate']:.0%}"
+        )
+        st.caption(f"{cache_stats['entries']} entries, {cache_stats['bytes'] / (1024 * 1024):.1f} MB")
+        flight_stats = get_singleflight().stats()
+        st.caption(
+            f"Coalesced: {flight_stats['coalesced']} of {flight_stats['leaders'] + flight_stats['coalesced']} "
+            f"syntheses ({flight_stats['coalesce_rate']:.0%}) · {flight_stats['in_flight']} in flight"
+        )
+        if st.button("Clear cache"):
+            audio_cache.clear()
 
-# Set OpenAI API key
-if 'OPENAI_API_KEY' not in st.secrets:
-    st.error("OpenAI API key not found in secrets!")
-    st.stop()
-else:
-    openai.api_key = st.secrets['OPENAI_API_KEY']
-
-# Load MMS model
-mms_model, mms_tokenizer = load_mms_model()
-
-# Main app
-st.title("Hebrew Text-to-Speech Comparison")
-st.write("Compare different TTS models for Hebrew text")
-
-# Model selection
-model_choice = st.radio(
-    "Choose TTS Model(s)",
-    ["OpenAI TTS", "OpenAI Chat TTS", "MMS-TTS", "Compare All"],
-    horizontal=True
-)
+        st.subheader("Output Format")
+        output_codec = st.selectbox(
+            "Audio format", available_codecs(),
+            index=available_codecs().index(DEFAULT_CODEC) if DEFAULT_CODEC in available_codecs() else 0,
+            help="Encoding for MMS-TTS output and the OpenAI TTS response; compressed formats "
+                 "transfer much faster than WAV (OpenAI returns MP3 when it cannot produce the format)"
+        )
 
-# OpenAI voice selection (only show if OpenAI TTS is selected)
-if model_choice in ["OpenAI TTS", "Compare All"]:
-    st.subheader("OpenAI TTS Settings")
-    voice_options = {
-        "Nova (Female)": "nova",
-        "Alloy (Neutral)": "alloy",
-        "Echo (Male)": "echo",
-        "Fable (Male)": "fable",
-        "Onyx (Male)": "onyx",
-        "Shimmer (Female)": "shimmer"
-    }
-    selected_voice = st.selectbox("Select OpenAI voice:", list(voice_options.keys()))
-
-# Chat TTS settings (only show if Chat TTS is selected)
-if model_choice in ["OpenAI Chat TTS", "Compare All"]:
-    st.subheader("OpenAI Chat TTS Settings")
-    preset_prompts = {
-        "British Teacher": "You are a helpful assistant that speaks in a British accent and enunciates like you're talking to a child.",
-        "Fast Speaker": "You are a helpful assistant that speaks in a British accent and speaks really fast.",
-        "Hebrew Speaker": "You are a helpful female chearful assistant that speaks in a correct Hebrew accent and enunciates like you're talking to a child.",
-        "Custom": "Custom prompt..."
-    }
-    selected_prompt = st.selectbox("Select speaking style:", list(preset_prompts.keys()))
-    
-    if selected_prompt == "Custom":
-        system_prompt = st.text_area("Enter custom system prompt:", 
-                                   height=100,
-                                   help="Describe how you want the assistant to speak")
-    else:
-        system_prompt = preset_prompts[selected_prompt]
+        st.subheader("MMS Model")
+        if mms_client is not None:
+            try:
+                server_stats = mms_client.stats()
+            except Exception as e:
+                st.caption(f"Server unreachable: {e}")
+            else:
+                st.caption(
+                    f"Server: {server_stats['alive']}/{server_stats['workers']} workers · "
+                    f"{server_stats['pending']}/{server_stats['max_queue']} pending · "
+                    f"{server_stats['rejected']} rejected"
+                )
+                st.caption(f"p50/p95: {server_stats['p50_ms']:.0f}/{server_stats['p95_ms']:.0f} ms")
+        else:
+            mms_report = mms_runtime.report()
+            if mms_report["state"] == "ready":
+                st.caption(
+                    f"Loaded in {mms_report['load_seconds']:.1f}s from {mms_report['source']}"
+                    f"{' (int8)' if mms_report['quantized'] else ''} · "
+                    f"threads {mms_report['intra_op_threads']}/{mms_report['inter_op_threads']}"
+                )
+                if "first_rtf" in mms_report:
+                    st.caption(f"RTF first/steady: {mms_report['first_rtf']:.2f}/{mms_report['steady_rtf']:.2f}")
+                batch_stats = get_batcher(mms_runtime.model, mms_runtime.tokenizer).stats()
+                st.caption(
+                    f"Batches: {batch_stats['batches']} · "
+                    f"Avg size: {batch_stats['avg_batch_size']:.1f} · "
+                    f"p50/p95: {batch_stats['p50_batch_ms']:.0f}/{batch_stats['p95_batch_ms']:.0f} ms"
+                )
+                frontend_stats = batch_stats["frontend"]
+                st.caption(
+                    f"Token cache: {frontend_stats['hit_rate']:.0%} hits · "
+                    f"{frontend_stats['saved_ms']:.0f} ms of tokenization saved"
+                )
+            else:
+                st.caption(f"State: {mms_report['state']}")
 
-# Text input
-text_input = st.text_area("Enter Hebrew text:", value="שלום עולם", height=150)
+        network_metrics = get_http_client().metrics()
+        if network_metrics:
+            st.subheader("Network")
+            for provider, metrics in network_metrics.items():
+                st.caption(
+                    f"{provider}: {metrics['in_flight']}/{metrics['limit']} in flight · "
+                    f"{metrics['requests']} calls · {metrics['retries']} retries · "
+                    f"p50/p95 {metrics['p50_ms']:.0f}/{metrics['p95_ms']:.0f} ms"
+                )
 
-# Generate button
-if st.button("Generate Speech"):
-    if not text_input.strip():
-        st.warning("Please enter some text first.")
-        st.stop()
+        span_stats = get_tracer().snapshot()
+        if span_stats:
+            st.subheader("Tracing")
+            for name, stats in span_stats.items():
+                st.caption(f"{name}: {stats['count']} · p50/p95 {stats['p50_ms']:.0f}/{stats['p95_ms']:.0f} ms")
+            if metrics_port:
+                st.caption(f"Metrics: http://127.0.0.1:{metrics_port}/metrics")
+
+    # Generate button
+    if st.button("Generate Speech"):
+        if not text_input.strip():
+            st.warning("Please enter some text first.")
+            st.stop()
 
-    # Create a timestamp for unique filenames
-    timestamp = time.strftime("%Y%m%d-%H%M%S")
-
-    if model_choice in ["OpenAI TTS", "Compare All"]:
-        st.subheader("OpenAI TTS Output")
-        with st.spinner("Generating OpenAI TTS audio..."):
-            openai_audio = openai_tts(text_input, voice=voice_options[selected_voice])
-            if openai_audio:
-                st.audio(openai_audio, format='audio/mp3')
-                # Add download button
-                download_filename = f"openai_tts_{timestamp}.mp3"
-                st.markdown(get_binary_file_downloader_html(openai_audio, download_filename), unsafe_allow_html=True)
-                os.unlink(openai_audio)
-
-    if model_choice in ["OpenAI Chat TTS", "Compare All"]:
-        st.subheader("OpenAI Chat TTS Output")
-        with st.spinner("Generating OpenAI Chat TTS audio..."):
-            chat_audio = openai_chat_tts(text_input, system_prompt)
-            if chat_audio:
-                st.audio(chat_audio, format='audio/mp3')
-                # Add download button
-                download_filename = f"openai_chat_tts_{timestamp}.mp3"
-                st.markdown(get_binary_file_downloader_html(chat_audio, download_filename), unsafe_allow_html=True)
-                os.unlink(chat_audio)
-
-    if model_choice in ["MMS-TTS", "Compare All"]:
-        st.subheader("MMS-TTS Output")
-        with st.spinner("Generating MMS-TTS audio..."):
-            if mms_model is not None and mms_tokenizer is not None:
-                mms_audio = mms_tts(text_input, mms_model, mms_tokenizer)
-                if mms_audio:
-                    st.audio(mms_audio, format='audio/wav')
-                    # Add download button
-                    download_filename = f"mms_tts_{timestamp}.wav"
-                    st.markdown(get_binary_file_downloader_html(mms_audio, download_filename), unsafe_allow_html=True)
-                    os.unlink(mms_audio)
+        # Create a timestamp for unique filenames
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        forget_audio("tts_outputs")
+
+        # Each selected backend gets its own output slot, filled as soon as it finishes
+        slots = {}
+        for name in ["OpenAI TTS", "OpenAI Chat TTS", "MMS-TTS", "Auto"]:
+            # Compare All runs the real backends; Auto only when chosen
+            if model_choice == name or (model_choice == "Compare All" and name != "Auto"):
+                slots[name] = st.container()
+                slots[name].subheader(f"{name} Output")
+
+        jobs = {}
+        streams = {}
+        # Compared side by side, OpenAI audio gets the same post-processing,
+        # rate and codec as MMS instead of OpenAI's own encoding
+        openai_codec = {"codec": output_codec} if model_choice == "Compare All" else {}
+        if "OpenAI TTS" in slots:
+            if stream_output:
+                streams["OpenAI TTS"] = (
+                    partial(stream_sync, "openai_tts", text_input, voice=voice_options[selected_voice]),
+                    lambda: OPENAI_PCM_SAMPLE_RATE,
+                    f"openai_tts_{timestamp}.wav",
+                )
             else:
-                st.error("MMS-TTS model failed to load")
-
-# Update the instructions to include download information
-st.markdown("""
----
-### Instructions:
-1. Choose the TTS model(s) you want to use
-2. If using OpenAI TTS, select a voice from the dropdown menu
-3. Type or paste Hebrew text in the text area above
-4. Click the 'Generate Speech' button
-5. Wait for the audio player(s) to appear
-6. Press play to hear the text being read
-7. Click the download link below each audio player to save the file
-
-### Notes:
-- OpenAI's TTS API may not perfectly pronounce Hebrew text
-- MMS-TTS is specifically trained for Hebrew but may sound more robotic
-- Compare both to choose the best option for your needs
-- Downloaded files will include a timestamp to prevent naming conflicts
-""") 
\ No newline at end of file
+                jobs["OpenAI TTS"] = (
+                    partial(synthesize_sync, "openai_tts", text_input, voice=voice_options[selected_voice],
+                            use_cache=use_cache,
+                            response_format=OPENAI_RESPONSE_FORMATS.get(output_codec, "mp3"),
+                            **openai_codec),
+                    f"openai_tts_{timestamp}",
+                )
+
+        if "OpenAI Chat TTS" in slots:
+            jobs["OpenAI Chat TTS"] = (
+                partial(synthesize_sync, "openai_chat_tts", text_input, system_prompt=system_prompt,
+                        use_cache=use_cache, **openai_codec),
+                f"openai_chat_tts_{timestamp}",
+            )
+
+        if "MMS-TTS" in slots:
+            # The MMS model (or server) is resolved on the job's worker; a cold
+            # load does not delay the network backends
+            if stream_output:
+                streams["MMS-TTS"] = (
+                    partial(stream_sync, "mms", text_input),
+                    lambda: mms_synthesizer().sampling_rate,
+                    f"mms_tts_{timestamp}.wav",
+                )
+            else:
+                jobs["MMS-TTS"] = (
+                    partial(synthesize_sync, "mms", text_input, use_cache=use_cache, codec=output_codec),
+                    f"mms_tts_{timestamp}",
+                )
+
+        auto_decisions = []
+        if "Auto" in slots:
+            jobs["Auto"] = (
+                partial(auto_tts, text_input, latency_target, {
+                    "openai_tts": {"voice": voice_options[selected_voice], "use_cache": use_cache,
+                                   "response_format": OPENAI_RESPONSE_FORMATS.get(output_codec, "mp3")},
+                    "openai_chat_tts": {"system_prompt": system_prompt, "use_cache": use_cache},
+                    "mms": {"use_cache": use_cache, "codec": output_codec},
+                }, auto_decisions),
+                f"auto_tts_{timestamp}",
+            )
+
+        # Network backends and MMS run concurrently, streamed or not, so the
+        # wall-clock time is bounded by the slowest backend rather than the sum
+        started = time.perf_counter()
+        ctx = get_script_run_ctx()
+        with ThreadPoolExecutor(max_workers=max(len(jobs) + len(streams), 1),
+                                thread_name_prefix="tts-fanout") as pool:
+            pending = {}
+            futures = {}
+            for name, (synthesize, _) in jobs.items():
+                pending[name] = slots[name].empty()
+                pending[name].info(f"Generating {name} audio...")
+                futures[pool.submit(run_in_slot, ctx, slots[name], synthesize)] = name
+
+            for name, (make_stream, get_sample_rate, download_filename) in streams.items():
+                futures[pool.submit(stream_in_slot, ctx, slots[name], name, make_stream, get_sample_rate,
+                                    download_filename)] = name
+
+            for future in as_completed(futures):
+                name = futures[future]
+                if name in streams:
+                    # The stream has already played in its slot
+                    full_audio = future.result()
+                    if full_audio is not None:
+                        _, _, download_filename = streams[name]
+                        remember_audio("tts_outputs", name, full_audio, download_filename)
+                    continue
+                pending[name].empty()
+                audio, elapsed = future.result()
+                if audio is not None:
+                    _, download_stem = jobs[name]
+                    download_filename = download_stem + audio.extension
+                    caption = f"Generated in {elapsed:.2f}s"
+                    with slots[name]:
+                        st.caption(caption)
+                        # Player and download button share the same bytes
+                        render_audio(audio, download_filename)
+                    remember_audio("tts_outputs", name, audio, download_filename, caption=caption)
+
+        for decision in auto_decisions:
+            with slots["Auto"]:
+                if decision.winner:
+                    st.caption(
+                        f"Routed to {decision.winner}"
+                        f"{' after a hedge' if decision.hedged else ''}"
+                        f"{' after a fallback' if decision.fell_back else ''}"
+                    )
+                with st.expander("Routing decision"):
+                    st.json(decision.as_dict())
+
+        if len(slots) > 1:
+            st.caption(f"All backends finished in {time.perf_counter() - started:.2f}s")
+    else:
+        # A download click reruns the script; show the last results again
+        render_remembered_audio("tts_outputs")
+
+    # Update the instructions to include download information
+    st.markdown("""
+    ---
+    ### Instructions:
+    1. Choose the TTS model(s) you want to use
+    2. If using OpenAI TTS, select a voice from the dropdown menu
+    3. Type or paste Hebrew text in the text area above
+    4. Click the 'Generate Speech' button
+    5. Wait for the audio player(s) to appear
+    6. Press play to hear the text being read
+    7. Click the download button below each audio player to save the file
+
+    ### Notes:
+    - OpenAI's TTS API may not perfectly pronounce Hebrew text
+    - MMS-TTS is specifically trained for Hebrew but may sound more robotic
+    - Compare both to choose the best option for your needs
+    - In "Compare All" mode the backends run in parallel and each result appears as soon as it is ready, with its generation time
+    - Downloaded files will include a timestamp to prevent naming conflicts
+    - Tick "Stream long text" to hear long paragraphs sentence by sentence while the rest is still being generated
+    - Identical requests are served from a local audio cache; untick "Reuse cached audio" in the sidebar to force a fresh generation
+    - Identical requests made at the same moment, even from different sessions, share a single generation
+    - "Auto" picks the backend most likely to meet the latency target from recent latencies and errors; open "Routing decision" to see why
+    """) 
+
+# Streamlit runs this script as __main__; importing it does not render the page
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compressed output codecs for locally synthesized audio.
+
+WAV is always available. FLAC, Ogg Opus, Ogg Vorbis and MP3 are encoded
+with libsndfile through soundfile when the installed build supports them
+(MP3 needs libsndfile 1.1 or newer). Encoding runs on the calling thread;
+for MMS that is the request's own thread, after the batcher has handed the
+waveform back, so it never holds up the next forward pass.
+"""
+import io
+import os
+
+import numpy as np
+
+try:
+    import soundfile
+except (ImportError, OSError):
+    # OSError: the package is installed but libsndfile itself is missing
+    soundfile = None
+
+DEFAULT_CODEC = os.environ.get("MMS_OUTPUT_CODEC", "wav")
+
+# codec -> (libsndfile format, subtype)
+SOUNDFILE_CODECS = {
+    "flac": ("FLAC", "PCM_16"),
+    "opus": ("OGG", "OPUS"),
+    "ogg": ("OGG", "VORBIS"),
+    "mp3": ("MP3", "MPEG_LAYER_III"),
+}
+
+# Ogg Opus only accepts these input rates
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Formats the OpenAI speech endpoint can return, and the codec each maps to
+OPENAI_RESPONSE_FORMATS = {
+    "mp3": "mp3",
+    "opus": "opus",
+    "flac": "flac",
+    "wav": "wav",
+}
+
+
+class CodecUnavailable(Exception):
+    """Raised when the requested codec cannot be encoded in this environment"""
+
+
+def available_codecs():
+    """Codecs this environment can encode, WAV first"""
+    codecs = ["wav"]
+    if soundfile is not None:
+        formats = soundfile.available_formats()
+        for codec, (fmt, subtype) in SOUNDFILE_CODECS.items():
+            if fmt in formats and subtype in soundfile.available_subtypes(fmt):
+                codecs.append(codec)
+    return codecs
+
+
+def _wav_bytes(samples, sample_rate):
+    import scipy.io.wavfile as wav
+
+    buffer = io.BytesIO()
+    wav.write(buffer, sample_rate, samples)
+    return buffer.getbuffer()
+
+
+def encode(samples, sample_rate, codec=DEFAULT_CODEC):
+    """Encode int16 samples and return (bytes-like, codec)"""
+    samples = np.asarray(samples, dtype=np.int16)
+    if codec == "wav":
+        return _wav_bytes(samples, sample_rate), codec
+    if codec not in available_codecs():
+        raise CodecUnavailable(f"{codec} encoding is not available; install libsndfile 1.1 or newer")
+    if codec == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+        raise CodecUnavailable(f"Opus cannot encode {sample_rate} Hz audio")
+    fmt, subtype = SOUNDFILE_CODECS[codec]
+    buffer = io.BytesIO()
+    soundfile.write(buffer, samples, sample_rate, format=fmt, subtype=subtype)
+    return buffer.getbuffer(), codec
+
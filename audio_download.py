@@ -0,0 +1,72 @@
+"""Shared audio playback and download widgets.
+
+The same in-memory bytes are handed to st.audio and st.download_button.
+Streamlit's media file manager keys files by their bytes, mimetype and file
+name, so the player and the download button are two media entries with the
+same bytes, both served over HTTP. The page itself only carries their URLs,
+however long the audio is (see benchmarks/download_payload.py).
+"""
+import os
+
+import streamlit as st
+
+from audio_result import AudioResult
+
+AUDIO_MIME_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".flac": "audio/flac",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+}
+
+
+def mime_for(file_name):
+    """Guess the audio mimetype from a file name"""
+    return AUDIO_MIME_TYPES.get(os.path.splitext(file_name)[1].lower(), "application/octet-stream")
+
+
+def _unwrap(data, file_name, mime):
+    if isinstance(data, AudioResult):
+        return data.tobytes(), mime or data.mime
+    return bytes(data), mime or mime_for(file_name)
+
+
+def render_audio(data, file_name, mime=None, autoplay=False, key=None):
+    """Play audio and offer it for download from the same in-memory bytes"""
+    data, mime = _unwrap(data, file_name, mime)
+    st.audio(data, format=mime, autoplay=autoplay)
+    st.download_button(
+        label=f"Download {file_name}",
+        data=data,
+        file_name=file_name,
+        mime=mime,
+        key=key or f"download-{file_name}",
+    )
+
+
+def remember_audio(group, name, data, file_name, mime=None, caption=None):
+    """Keep a rendered result so it can be shown again after the rerun a download click triggers"""
+    data, mime = _unwrap(data, file_name, mime)
+    outputs = st.session_state.setdefault(group, {})
+    outputs[name] = {
+        "data": data,
+        "file_name": file_name,
+        "mime": mime,
+        "caption": caption,
+    }
+
+
+def forget_audio(group):
+    """Drop the remembered results of a group before generating new ones"""
+    st.session_state.pop(group, None)
+
+
+def render_remembered_audio(group, headings=True):
+    """Render every remembered result of a group"""
+    for name, output in st.session_state.get(group, {}).items():
+        if headings:
+            st.subheader(f"{name} Output")
+        if output["caption"]:
+            st.caption(output["caption"])
+        render_audio(output["data"], output["file_name"], output["mime"])
@@ -0,0 +1,152 @@
+"""Vectorized post-processing of synthesized waveforms.
+
+VITS output is a float waveform with leading and trailing silence, an
+arbitrary level and the model's own sample rate, and OpenAI audio arrives at
+a different level and rate. postprocess() makes them comparable: silence is
+trimmed by frame energy, the signal is resampled with a polyphase filter,
+the gain is set from an ITU-R BS.1770 style integrated loudness (K-weighted,
+gated) and capped so the peak stays below full scale, and the result is
+scaled in one float32 scratch array and converted to int16. Every step works
+on whole arrays; nothing loops over samples in Python.
+"""
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+from scipy import signal
+
+DEFAULT_TARGET_LUFS = float(os.environ.get("TTS_TARGET_LUFS", "-20"))
+DEFAULT_PEAK_DB = -1.0
+DEFAULT_SILENCE_DB = -45.0
+SILENCE_FRAME_MS = 10
+SILENCE_PAD_MS = 40
+
+# BS.1770 gating: 400 ms blocks with 75% overlap, absolute and relative gates
+LOUDNESS_BLOCK_S = 0.4
+LOUDNESS_OVERLAP = 0.75
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+
+def db_to_gain(db):
+    return 10 ** (db / 20)
+
+
+@lru_cache(maxsize=16)
+def k_weighting(sample_rate):
+    """Second-order sections of the BS.1770 K-weighting filter at sample_rate"""
+    # High shelf modelling the head, then the RLB high-pass, both derived from
+    # the analog prototypes so the filter is valid at any sample rate
+    fc, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * fc / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+             1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    fc, q = 38.13547087613982, 0.5003270373253953
+    k = math.tan(math.pi * fc / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf, highpass])
+
+
+def integrated_loudness(samples, sample_rate):
+    """Gated integrated loudness of a mono float waveform in LUFS"""
+    samples = np.asarray(samples, dtype=np.float32)
+    if not len(samples):
+        return -math.inf
+    weighted = signal.sosfilt(k_weighting(sample_rate), samples)
+    block = int(LOUDNESS_BLOCK_S * sample_rate)
+    if len(weighted) < block:
+        energies = np.array([np.mean(weighted ** 2)])
+    else:
+        # Block mean squares from one cumulative sum instead of a loop over blocks
+        step = max(1, int(block * (1 - LOUDNESS_OVERLAP)))
+        cumulative = np.concatenate(([0.0], np.cumsum(weighted.astype(np.float64) ** 2)))
+        starts = np.arange(0, len(weighted) - block + 1, step)
+        energies = (cumulative[starts + block] - cumulative[starts]) / block
+
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(energies)
+    gated = energies[block_loudness > ABSOLUTE_GATE_LUFS]
+    if not len(gated):
+        return -math.inf
+    relative_gate = -0.691 + 10 * math.log10(gated.mean()) + RELATIVE_GATE_LU
+    gated = energies[(block_loudness > ABSOLUTE_GATE_LUFS) & (block_loudness > relative_gate)]
+    return -0.691 + 10 * math.log10(gated.mean())
+
+
+def trim_silence(samples, sample_rate, threshold_db=DEFAULT_SILENCE_DB, frame_ms=SILENCE_FRAME_MS,
+                 pad_ms=SILENCE_PAD_MS):
+    """Return a view of samples without leading and trailing silence"""
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    frames = len(samples) // frame
+    if not frames:
+        return samples
+    # Frame RMS relative to the loudest frame, computed on a reshaped view
+    rms = np.sqrt(np.mean(np.square(samples[:frames * frame].reshape(frames, frame)), axis=1))
+    peak = rms.max()
+    if peak <= 0:
+        return samples[:0]
+    voiced = np.flatnonzero(rms >= peak * db_to_gain(threshold_db))
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def resample(samples, sample_rate, target_rate):
+    """Polyphase resampling to target_rate"""
+    if not target_rate or target_rate == sample_rate:
+        return samples
+    divisor = math.gcd(sample_rate, target_rate)
+    return signal.resample_poly(samples, target_rate // divisor, sample_rate // divisor).astype(np.float32, copy=False)
+
+
+def loudness_gain(samples, sample_rate, target_lufs=DEFAULT_TARGET_LUFS, peak_db=DEFAULT_PEAK_DB):
+    """Linear gain reaching target_lufs without pushing the peak above peak_db"""
+    peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+    if peak == 0:
+        return 1.0
+    peak_limit = db_to_gain(peak_db) / peak
+    if target_lufs is None:
+        # Peak-safe conversion only: never amplify, only pull clipping peaks down
+        return min(1.0, peak_limit)
+    loudness = integrated_loudness(samples, sample_rate)
+    if not math.isfinite(loudness):
+        return min(1.0, peak_limit)
+    return min(db_to_gain(target_lufs - loudness), peak_limit)
+
+
+def to_int16(samples, gain=1.0, out=None):
+    """Scale, clip and convert a float waveform to int16
+
+    Scaling, clipping and rounding share one float32 scratch array allocated
+    per call; the int16 result is written into out when one is given.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if out is None:
+        out = np.empty(len(samples), dtype=np.int16)
+    scratch = np.multiply(samples, gain * 32767, dtype=np.float32)
+    np.clip(scratch, -32768, 32767, out=scratch)
+    np.rint(scratch, out=scratch)
+    out[:] = scratch
+    return out
+
+
+def postprocess(samples, sample_rate, target_rate=None, target_lufs=DEFAULT_TARGET_LUFS,
+                peak_db=DEFAULT_PEAK_DB, trim=True):
+    """Trim, resample, loudness-normalize and convert a float waveform
+
+    Returns the int16 samples and their sample rate.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if trim:
+        samples = trim_silence(samples, sample_rate)
+    samples = resample(samples, sample_rate, target_rate)
+    sample_rate = target_rate or sample_rate
+    gain = loudness_gain(samples, sample_rate, target_lufs, peak_db)
+    return to_int16(samples, gain), sample_rate
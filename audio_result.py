@@ -0,0 +1,55 @@
+"""In-memory result type returned by the synthesis functions.
+
+Audio stays in memory from synthesis to playback; a file is only written
+when a caller explicitly asks to persist the result.
+"""
+from dataclasses import dataclass
+from tempfile import NamedTemporaryFile
+from typing import Union
+
+CODEC_MIME_TYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg",
+    "opus": "audio/ogg",
+    "pcm": "audio/L16",
+}
+
+
+@dataclass(frozen=True)
+class AudioResult:
+    """Encoded audio bytes together with their sample rate and codec
+
+    cached is True when the audio came from the audio cache rather than a synthesis.
+    """
+
+    data: Union[bytes, memoryview]
+    sample_rate: int
+    codec: str
+    cached: bool = False
+
+    @property
+    def mime(self):
+        return CODEC_MIME_TYPES.get(self.codec, "application/octet-stream")
+
+    @property
+    def extension(self):
+        return "." + self.codec
+
+    def __len__(self):
+        return len(self.data)
+
+    def tobytes(self):
+        """Return the audio as bytes, copying only if it is held as a memoryview"""
+        return self.data if isinstance(self.data, bytes) else bytes(self.data)
+
+    def save(self, path=None):
+        """Persist the audio to path, or to a new temporary file, and return the path"""
+        if path is None:
+            with NamedTemporaryFile(delete=False, suffix=self.extension) as fp:
+                fp.write(self.data)
+                return fp.name
+        with open(path, "wb") as f:
+            f.write(self.data)
+        return path
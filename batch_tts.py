@@ -0,0 +1,261 @@
+"""Headless batch text-to-speech over the tts_engine backends.
+
+Reads lines from a JSONL or CSV file (columns: id, text and optionally
+backend, voice, system_prompt), synthesizes them with openai_tts,
+openai_chat_tts or mms_tts, and writes one audio file per line plus a
+results index. OpenAI backends run on thread pools with bounded
+concurrency; MMS lines are sent in batches to a pool of worker processes,
+each of which batches its texts into shared forward passes. Completed ids
+are appended to a manifest, so an interrupted run picks up where it stopped.
+
+Example:
+    python batch_tts.py lines.jsonl --out out/ --backend mms --mms-workers 2
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from audio_codecs import OPENAI_RESPONSE_FORMATS
+from tts_registry import PRESET_PROMPTS
+
+BACKENDS = ("openai_tts", "openai_chat_tts", "mms")
+# Ids name the output files, so they may not contain path separators
+ID_PATTERN = re.compile(r"[\w.-]+")
+
+
+def read_lines(path):
+    """Yield row dicts from a JSONL or CSV file"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def valid_id(row_id):
+    """True if row_id can be used as a file name inside the audio directory"""
+    return bool(ID_PATTERN.fullmatch(row_id)) and row_id.strip(".") != ""
+
+
+def load_manifest(path):
+    """Return the ids already completed by earlier runs"""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+class ResultWriter:
+    """Thread-safe writer for audio files, the results index and the manifest"""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.audio_dir = os.path.join(out_dir, "audio")
+        os.makedirs(self.audio_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = open(os.path.join(out_dir, "results.jsonl"), "a", encoding="utf-8")
+        self._manifest = open(os.path.join(out_dir, "manifest.txt"), "a", encoding="utf-8")
+        self.ok = 0
+        self.failed = 0
+
+    def write(self, row, backend, audio, seconds, error=None):
+        record = {"id": row["id"], "backend": backend, "seconds": round(seconds, 3)}
+        if audio is not None:
+            path = os.path.join(self.audio_dir, f"{row['id']}{audio.extension}")
+            audio.save(path)
+            record.update(status="ok", path=os.path.relpath(path, self.out_dir),
+                          bytes=len(audio), sample_rate=audio.sample_rate)
+        else:
+            record.update(status="failed", error=error or "synthesis returned no audio")
+        with self._lock:
+            self._index.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._index.flush()
+            if audio is not None:
+                self._manifest.write(f"{row['id']}\n")
+                self._manifest.flush()
+                self.ok += 1
+            else:
+                self.failed += 1
+
+    def close(self):
+        self._index.close()
+        self._manifest.close()
+
+
+def synthesize_openai(row, backend, use_cache, codec):
+    from tts_engine import openai_chat_tts, openai_tts
+
+    start = time.perf_counter()
+    if backend == "openai_tts":
+        audio = openai_tts(row["text"], voice=row.get("voice") or "nova", use_cache=use_cache,
+                           response_format=OPENAI_RESPONSE_FORMATS.get(codec, "mp3"))
+    else:
+        audio = openai_chat_tts(row["text"], row.get("system_prompt") or PRESET_PROMPTS["Hebrew Speaker"],
+                                use_cache=use_cache)
+    return audio, time.perf_counter() - start
+
+
+_worker_runtime = None
+
+
+def _init_mms_worker(threads):
+    """Load the MMS model once per worker process"""
+    global _worker_runtime
+    from mms_runtime import MMSRuntime
+
+    _worker_runtime = MMSRuntime(intra_op_threads=threads, inter_op_threads=1, warmup=False).start()
+
+
+def synthesize_mms_batch(rows, use_cache, codec):
+    """Synthesize a batch of rows in a worker process
+
+    Every row is submitted to mms_tts at once, so the worker's batcher groups
+    them into length-bucketed forward passes.
+    """
+    from tts_engine import TTSError, mms_tts
+
+    model, tokenizer = _worker_runtime.wait()
+    start = time.perf_counter()
+
+    def run(row):
+        try:
+            audio = mms_tts(row["text"], model, tokenizer, use_cache=use_cache, codec=codec)
+        except TTSError as e:
+            return None, None, str(e)
+        # AudioResult may hold a memoryview, which does not pickle
+        return audio.tobytes(), audio.sample_rate, None
+
+    with ThreadPoolExecutor(max_workers=len(rows)) as pool:
+        outputs = list(pool.map(run, rows))
+    seconds = (time.perf_counter() - start) / len(rows)
+    return [(row, *output, seconds) for row, output in zip(rows, outputs)]
+
+
+def batched(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch text-to-speech over the tts_engine backends")
+    parser.add_argument("input", help="JSONL or CSV file with id and text columns")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--backend", choices=BACKENDS, default="mms",
+                        help="Backend for rows that do not name one")
+    parser.add_argument("--openai-concurrency", type=int, default=4,
+                        help="Concurrent requests per OpenAI backend")
+    parser.add_argument("--mms-workers", type=int, default=max(1, (os.cpu_count() or 2) // 4),
+                        help="MMS worker processes")
+    parser.add_argument("--mms-batch", type=int, default=8, help="Lines per MMS batch")
+    parser.add_argument("--codec", choices=["wav", "flac", "opus", "ogg", "mp3"], default="wav",
+                        help="Output encoding; OpenAI backends fall back to MP3 for formats they cannot return")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the audio cache")
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    os.makedirs(args.out, exist_ok=True)
+    done = load_manifest(os.path.join(args.out, "manifest.txt"))
+    pending = {backend: [] for backend in BACKENDS}
+    invalid = []
+    skipped = 0
+    for row in read_lines(args.input):
+        row["id"] = str(row["id"])
+        if row["id"] in done:
+            skipped += 1
+            continue
+        backend = row.get("backend") or args.backend
+        if backend not in BACKENDS:
+            parser.error(f"Unknown backend {backend!r} for id {row['id']}")
+        if not valid_id(row["id"]):
+            invalid.append((backend, row))
+            continue
+        pending[backend].append(row)
+
+    total = sum(len(rows) for rows in pending.values()) + len(invalid)
+    print(f"{total} lines to synthesize, {skipped} already done", file=sys.stderr)
+    if not total:
+        return 0
+
+    use_cache = not args.no_cache
+    writer = ResultWriter(args.out)
+    start = time.perf_counter()
+
+    def report():
+        finished = writer.ok + writer.failed
+        elapsed = time.perf_counter() - start
+        print(f"\r{finished}/{total} lines · {finished / elapsed:.2f} lines/s · {writer.failed} failed",
+              end="", file=sys.stderr)
+
+    for backend, row in invalid:
+        writer.write(row, backend, None, 0.0,
+                     error=f"Invalid id {row['id']!r}: use letters, digits, '.', '_' and '-' only")
+        report()
+
+    pools = []
+    futures = {}
+    try:
+        for backend in ("openai_tts", "openai_chat_tts"):
+            if pending[backend]:
+                pool = ThreadPoolExecutor(max_workers=args.openai_concurrency, thread_name_prefix=backend)
+                pools.append(pool)
+                for row in pending[backend]:
+                    futures[pool.submit(synthesize_openai, row, backend, use_cache, args.codec)] = (backend, row)
+
+        if pending["mms"]:
+            threads = max(1, (os.cpu_count() or 1) // args.mms_workers)
+            pool = ProcessPoolExecutor(
+                max_workers=args.mms_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_mms_worker,
+                initargs=(threads,),
+            )
+            pools.append(pool)
+            for rows in batched(pending["mms"], args.mms_batch):
+                futures[pool.submit(synthesize_mms_batch, rows, use_cache, args.codec)] = ("mms", rows)
+
+        from audio_result import AudioResult
+
+        for future in as_completed(futures):
+            backend, item = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                for row in (item if backend == "mms" else [item]):
+                    writer.write(row, backend, None, 0.0, error=str(e))
+                report()
+                continue
+            if backend == "mms":
+                for row, data, sample_rate, error, seconds in result:
+                    audio = AudioResult(data, sample_rate, args.codec) if data is not None else None
+                    writer.write(row, backend, audio, seconds, error=error)
+            else:
+                audio, seconds = result
+                writer.write(item, backend, audio, seconds)
+            report()
+    finally:
+        for pool in pools:
+            pool.shutdown(cancel_futures=True)
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\nDone: {writer.ok} ok, {writer.failed} failed in {elapsed:.1f}s "
+          f"({(writer.ok + writer.failed) / elapsed:.2f} lines/s)", file=sys.stderr)
+    return 1 if writer.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
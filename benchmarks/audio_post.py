@@ -0,0 +1,80 @@
+"""Time the audio post-processing stage per second of audio.
+
+A speech-like test signal (modulated tones between stretches of silence) is
+run through each step of audio_post.postprocess and through the whole
+stage. Times are reported in milliseconds per second of audio, next to the
+old `np.int16(waveform * 32767)` conversion.
+
+Usage: python benchmarks/audio_post.py [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_post import integrated_loudness, postprocess, resample, to_int16, trim_silence  # noqa: E402
+
+DURATIONS = [2, 10, 60]
+CASES = [(16000, None), (16000, 24000), (24000, None)]
+
+
+def make_speech_like(seconds, sample_rate, seed=0):
+    """Syllable-rate modulated tones with half a second of silence at each end"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    voiced = envelope * (np.sin(2 * np.pi * 180 * t) + 0.3 * np.sin(2 * np.pi * 2400 * t))
+    voiced += 0.01 * rng.standard_normal(len(t))
+    silence = np.zeros(sample_rate // 2)
+    return np.concatenate([silence, 1.3 * voiced, silence]).astype(np.float32)
+
+
+def best_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = []
+    for sample_rate, target_rate in CASES:
+        for seconds in DURATIONS:
+            samples = make_speech_like(seconds, sample_rate)
+            audio_seconds = len(samples) / sample_rate
+            steps = {
+                "naive_int16": lambda: np.int16(samples * 32767),
+                "trim": lambda: trim_silence(samples, sample_rate),
+                "resample": lambda: resample(samples, sample_rate, target_rate),
+                "loudness": lambda: integrated_loudness(samples, sample_rate),
+                "to_int16": lambda: to_int16(samples, 0.5),
+                "postprocess": lambda: postprocess(samples, sample_rate, target_rate=target_rate),
+            }
+            row = {"sample_rate": sample_rate, "target_rate": target_rate, "seconds": seconds}
+            for name, fn in steps.items():
+                row[f"{name}_ms_per_s"] = best_ms(fn, args.repeat) / audio_seconds
+            rows.append(row)
+
+    print(f"{'rate':>6} {'target':>7} {'secs':>5} {'naive':>8} {'trim':>8} {'resample':>9} "
+          f"{'loudness':>9} {'int16':>8} {'total':>8}   (ms per second of audio)")
+    for row in rows:
+        print(f"{row['sample_rate']:>6} {row['target_rate'] or '-':>7} {row['seconds']:>5} "
+              f"{row['naive_int16_ms_per_s']:>8.3f} {row['trim_ms_per_s']:>8.3f} "
+              f"{row['resample_ms_per_s']:>9.3f} {row['loudness_ms_per_s']:>9.3f} "
+              f"{row['to_int16_ms_per_s']:>8.3f} {row['postprocess_ms_per_s']:>8.3f}")
+    print(json.dumps(rows))
+
+
+if __name__ == "__main__":
+    main()
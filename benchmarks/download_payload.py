@@ -0,0 +1,132 @@
+"""Measure what the old base64 download link and the shared download layer send to the browser.
+
+Both versions of the page are run headless with Streamlit's AppTest. The
+page payload is the serialized size of every ForwardMsg the script run
+produces, i.e. what goes over the websocket. The media payload is what the
+media file manager stores and serves over HTTP. The old page embedded the
+whole file as a base64 data URI in its markdown, next to an st.audio player
+that was fetched separately. The new page hands the same bytes to st.audio
+and st.download_button. Streamlit keys media files by bytes, mimetype and
+file name, so that is two media entries; the websocket only carries their
+URLs.
+
+Usage: python benchmarks/download_payload.py [--sample-rate 16000]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import wave
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DURATIONS = [5, 30, 60, 300]
+
+
+def make_wav(seconds, sample_rate):
+    """Build a 16-bit mono WAV of the given length"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(b"\x01\x00" * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+
+def old_page(data, file_label):
+    import base64
+
+    import streamlit as st
+
+    st.audio(data, format="audio/wav")
+    b64 = base64.b64encode(data).decode()
+    href = f'<a href="data:application/octet-stream;base64,{b64}" download="{file_label}">Download {file_label}</a>'
+    st.markdown(href, unsafe_allow_html=True)
+
+
+def new_page(root, data, file_label):
+    import sys
+
+    sys.path.insert(0, root)
+    from audio_download import render_audio
+
+    render_audio(data, file_label)
+
+
+class RecordingRunner(app_test.LocalScriptRunner):
+    """Keeps the ForwardMsgs of the last run for measuring"""
+
+    last = None
+
+    def run(self, *args, **kwargs):
+        tree = super().run(*args, **kwargs)
+        type(self).last = self
+        return tree
+
+
+class RecordingStorage(app_test.MemoryMediaFileStorage):
+    """Keeps the media storage of the last run for measuring"""
+
+    last = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        type(self).last = self
+
+
+def measure(script, args):
+    """Run a page once and return (websocket bytes, media files, media bytes)"""
+    at = AppTest.from_function(script, args=args, default_timeout=30).run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    messages = RecordingRunner.last.forward_msgs()
+    files = RecordingStorage.last._files_by_id.values()
+    return (
+        sum(len(msg.SerializeToString()) for msg in messages),
+        len(files),
+        sum(f.content_size for f in files),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    args = parser.parse_args()
+
+    app_test.LocalScriptRunner = RecordingRunner
+    app_test.MemoryMediaFileStorage = RecordingStorage
+
+    rows = []
+    for seconds in DURATIONS:
+        data = make_wav(seconds, args.sample_rate)
+        label = f"mms_tts_{seconds}s.wav"
+        old_ws, old_files, old_media = measure(old_page, (data, label))
+        new_ws, new_files, new_media = measure(new_page, (ROOT, data, label))
+        rows.append({
+            "seconds": seconds,
+            "audio_bytes": len(data),
+            "old_websocket_bytes": old_ws,
+            "new_websocket_bytes": new_ws,
+            "old_media_files": old_files,
+            "new_media_files": new_files,
+            "old_media_bytes": old_media,
+            "new_media_bytes": new_media,
+        })
+
+    print(f"{'seconds':>8} {'audio':>10} {'old ws':>10} {'new ws':>8} "
+          f"{'old media':>14} {'new media':>14}")
+    for row in rows:
+        print(f"{row['seconds']:>8} {row['audio_bytes']:>10} {row['old_websocket_bytes']:>10} "
+              f"{row['new_websocket_bytes']:>8} "
+              f"{row['old_media_bytes']:>10} ({row['old_media_files']}) "
+              f"{row['new_media_bytes']:>10} ({row['new_media_files']})")
+    print(json.dumps(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare MMS model cold starts from the Hugging Face hub and from the local artifact.
+
+Each source is loaded in fresh interpreters, several times. For every run
+the time to a loaded model, the time to the first waveform, and the
+process's resident memory are reported, split into anonymous pages (private
+to the process) and file-backed pages (the mapped safetensors file, shared
+with every other process that maps it). The hub run uses the local hub
+cache, so neither source is timed on a network download.
+
+Export the artifact first with `python mms_artifact.py export`.
+
+Usage: python benchmarks/model_load.py [--runs 3] [--source hub --source artifact]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = ["hub", "artifact"]
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+from mms_artifact import load_artifact, resolve_artifact
+from mms_runtime import MODEL_ID, measure_rtf
+
+def memory():
+    fields = {{}}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0]) / 1024
+    return fields
+
+if {source!r} == "artifact":
+    path = resolve_artifact()
+    if path is None:
+        raise SystemExit("no artifact; run `python mms_artifact.py export` first")
+    model, tokenizer, manifest = load_artifact(path)
+    mmap = manifest["mmap"]
+else:
+    from transformers import AutoTokenizer, VitsModel
+    model = VitsModel.from_pretrained(MODEL_ID)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+    model.eval()
+    mmap = False
+loaded = time.perf_counter() - start
+after_load = memory()
+rtf = measure_rtf(model, tokenizer)
+first_audio = time.perf_counter() - start
+print(json.dumps({{"load_s": loaded, "first_audio_s": first_audio, "rtf": rtf, "mmap": mmap,
+                  "after_load": after_load, "after_inference": memory()}}))
+"""
+
+
+def measure(source, runs):
+    """Load from source in fresh interpreters and return median timings and memory"""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(source=source)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            return {"source": source, "error": (result.stderr.strip().splitlines() or ["failed"])[-1]}
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    def median(pick):
+        return statistics.median(pick(s) for s in samples)
+
+    return {
+        "source": source,
+        "runs": runs,
+        "mmap": samples[-1]["mmap"],
+        "load_s": median(lambda s: s["load_s"]),
+        "first_audio_s": median(lambda s: s["first_audio_s"]),
+        "rss_mb": median(lambda s: s["after_load"]["VmRSS"]),
+        "anon_mb": median(lambda s: s["after_load"]["RssAnon"]),
+        "file_mb": median(lambda s: s["after_load"]["RssFile"]),
+        "rss_after_inference_mb": median(lambda s: s["after_inference"]["VmRSS"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--source", action="append", dest="sources", choices=SOURCES,
+                        help="Source to load from (repeatable)")
+    args = parser.parse_args()
+
+    rows = [measure(source, args.runs) for source in args.sources or SOURCES]
+
+    print(f"{'source':>9} {'load s':>7} {'1st audio s':>12} {'RSS MB':>8} {'anon MB':>8} {'file MB':>8} "
+          f"{'RSS after infer':>16}")
+    for row in rows:
+        if "error" in row:
+            print(f"{row['source']:>9} failed: {row['error']}")
+            continue
+        print(f"{row['source']:>9} {row['load_s']:>7.2f} {row['first_audio_s']:>12.2f} {row['rss_mb']:>8.0f} "
+              f"{row['anon_mb']:>8.0f} {row['file_mb']:>8.0f} {row['rss_after_inference_mb']:>16.0f}")
+    print(json.dumps(rows))
+
+
+if __name__ == "__main__":
+    main()
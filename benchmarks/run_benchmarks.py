@@ -0,0 +1,364 @@
+"""Reproducible latency, RTF and memory benchmarks for every synthesis and lipsync path.
+
+Suites:
+  mms     MMS-TTS cold load, then warm synthesis over text lengths, batch
+          sizes and torch thread counts. Each thread count runs in a fresh
+          process, because torch only accepts the inter-op setting once.
+  openai  openai_tts and openai_chat_tts against a local stub of the OpenAI
+          API, through the real pooled client and retry path (cache bypassed).
+  gooey   Lipsync job submit, poll-to-completion and video download against
+          a local stub of the Gooey.ai async API.
+
+The stubs answer after a fixed simulated service time (--stub-latency-ms), so
+network results measure this app's own overhead rather than the providers.
+Results (p50/p95/p99 latency, throughput, RTF, peak RSS) are written as
+JSON; --baseline compares them with an earlier run and exits with status 1
+when a metric regressed by more than --tolerance.
+
+Usage:
+  python benchmarks/run_benchmarks.py --suite mms,openai,gooey --out bench.json
+  python benchmarks/run_benchmarks.py --suite openai --baseline bench.json
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TEXTS = {
+    "short": "שלום עולם",
+    "medium": "מערכת הדיבור הופכת טקסט בעברית לקול טבעי, ומאפשרת להשוות בין מודלים שונים.",
+    "long": " ".join([
+        "מערכת הדיבור הופכת טקסט בעברית לקול טבעי.",
+        "היא משווה בין שירותי ענן לבין מודל מקומי שרץ על המעבד.",
+        "כל משפט מסונתז בנפרד, והקטעים מחוברים יחד בסוף.",
+        "כך אפשר לשמוע את תחילת הפסקה עוד לפני שסופה מוכן.",
+    ]),
+}
+BATCH_SIZES = [1, 4, 8]
+# Metrics compared against a baseline; higher is worse for all of them
+REGRESSION_METRICS = ["p50_ms", "p95_ms", "rtf", "peak_rss_mb"]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def summarize(latencies, items=1, audio_seconds=None):
+    """p50/p95/p99 latency, throughput and, for audio, the real-time factor"""
+    ordered = sorted(latencies)
+    total = sum(latencies)
+    result = {
+        "runs": len(latencies),
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "throughput_per_s": items * len(latencies) / total if total else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if audio_seconds:
+        result["rtf"] = (total / len(latencies)) / audio_seconds
+    return result
+
+
+def timed(fn, runs, warmup=1):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    value = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        value = fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies, value
+
+
+# --- MMS -------------------------------------------------------------------
+
+def mms_worker(threads, runs):
+    """Run the warm MMS measurements for one thread count and print them as JSON"""
+    from mms_batcher import run_batch
+    from mms_runtime import MMSRuntime
+
+    start = time.perf_counter()
+    runtime = MMSRuntime(intra_op_threads=threads, inter_op_threads=1, warmup=False).start()
+    model, tokenizer = runtime.wait()
+    results = {f"mms.cold_load.threads={threads}": {
+        "load_s": time.perf_counter() - start,
+        "peak_rss_mb": peak_rss_mb(),
+    }}
+    sample_rate = model.config.sampling_rate
+    for length, text in TEXTS.items():
+        for batch in BATCH_SIZES:
+            texts = [text] * batch
+            latencies, waveforms = timed(lambda: run_batch(model, tokenizer, texts), runs)
+            audio_seconds = sum(len(w) for w in waveforms) / sample_rate
+            results[f"mms.warm.threads={threads}.len={length}.batch={batch}"] = summarize(
+                latencies, items=batch, audio_seconds=audio_seconds)
+    print(json.dumps(results))
+
+
+def run_mms(args):
+    results = {}
+    for threads in args.threads:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--mms-worker", str(threads), "--runs", str(args.runs)],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            results[f"mms.threads={threads}"] = {"error": proc.stderr.strip().splitlines()[-1]}
+            continue
+        results.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return results
+
+
+# --- Local stub servers ----------------------------------------------------
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; avoid delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+    latency = 0.05
+    audio = b"\xff\xfb\x90\x00" * 4096
+    video = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * (2 * 1024 * 1024)
+    polls_to_complete = 1
+    jobs = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        self._read_body()
+        time.sleep(self.latency)
+        base = f"http://{self.headers['Host']}"
+        if self.path.endswith("/audio/speech"):
+            self._send(200, self.audio, "audio/mpeg")
+        elif self.path.endswith("/chat/completions"):
+            self._send(200, {
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+                "model": "gpt-4o-audio-preview",
+                "choices": [{
+                    "index": 0, "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": None, "audio": {
+                        "id": "audio-bench", "expires_at": int(time.time()) + 3600,
+                        "data": base64.b64encode(self.audio).decode(), "transcript": "",
+                    }},
+                }],
+            })
+        elif "/v3/LipsyncTTS/async" in self.path:
+            run_id = uuid.uuid4().hex
+            self.jobs[run_id] = 0
+            self._send(202, {
+                "run_id": run_id,
+                "web_url": f"{base}/runs/{run_id}",
+                "status_url": f"{base}/status/{run_id}",
+            })
+        else:
+            self._send(404, {"detail": "not found"})
+
+    def do_GET(self):
+        base = f"http://{self.headers['Host']}"
+        if self.path.startswith("/status/"):
+            run_id = self.path.rsplit("/", 1)[1]
+            self.jobs[run_id] = self.jobs.get(run_id, 0) + 1
+            if self.jobs[run_id] >= self.polls_to_complete:
+                self._send(200, {"status": "completed", "output": {"output_video": f"{base}/video/{run_id}.mp4"}})
+            else:
+                self._send(200, {"status": "running"})
+        elif self.path.startswith("/video/"):
+            self._send(200, self.video, "video/mp4")
+        else:
+            self._send(404, {"detail": "not found"})
+
+
+def start_stub(latency_ms):
+    handler = type("StubHandler", (_StubHandler,), {"latency": latency_ms / 1000, "jobs": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, name="bench-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Network backends ------------------------------------------------------
+
+def run_openai(args, base_url):
+    from http_client import set_openai_client
+    from tts_engine import openai_chat_tts, openai_tts
+
+    os.environ["OPENAI_BASE_URL"] = base_url + "/v1"
+    os.environ["OPENAI_API_KEY"] = "bench"
+    # Rebuild the shared client so it points at the stub
+    set_openai_client(None)
+
+    results = {}
+    for length, text in TEXTS.items():
+        latencies, _ = timed(lambda: openai_tts(text, use_cache=False), args.runs)
+        results[f"openai_tts.len={length}"] = summarize(latencies)
+        latencies, _ = timed(lambda: openai_chat_tts(text, "benchmark", use_cache=False), args.runs)
+        results[f"openai_chat_tts.len={length}"] = summarize(latencies)
+    return results
+
+
+def run_gooey(args, base_url):
+    from lipsync_jobs import LipsyncJobManager, LipsyncJobStore
+    from video_download import download_file
+
+    work_dir = tempfile.mkdtemp(prefix="bench-gooey-")
+    manager = LipsyncJobManager("bench", base_url=base_url,
+                                store=LipsyncJobStore(os.path.join(work_dir, "jobs.sqlite3")))
+    payload = {"text_prompt": TEXTS["short"], "input_face": base_url + "/face.jpg"}
+
+    submit, complete = [], []
+    output_urls = []
+    runs = max(1, args.runs // 4)
+    for _ in range(runs):
+        start = time.perf_counter()
+        job_id = manager.submit(payload)
+        submit.append(time.perf_counter() - start)
+        while manager.get(job_id)["status"] not in ("completed", "failed"):
+            time.sleep(0.05)
+        complete.append(time.perf_counter() - start)
+        output_urls.append(manager.get(job_id)["output_url"])
+
+    downloads = []
+    for i, url in enumerate(output_urls):
+        start = time.perf_counter()
+        download_file(url, path=os.path.join(work_dir, f"video-{i}.mp4"))
+        downloads.append(time.perf_counter() - start)
+
+    return {
+        "gooey.submit": summarize(submit),
+        # Includes the job manager's initial poll delay and backoff
+        "gooey.submit_to_completed": summarize(complete),
+        "gooey.video_download": summarize(downloads),
+    }
+
+
+# --- Baseline comparison ---------------------------------------------------
+
+def compare(results, baseline, tolerance):
+    """Return (name, metric, baseline, current) for every metric that regressed"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or "error" in current:
+            continue
+        for metric in REGRESSION_METRICS:
+            if metric in current and previous.get(metric):
+                if current[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append((name, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", default="mms,openai,gooey", help="Comma-separated suites to run")
+    parser.add_argument("--runs", type=int, default=20, help="Timed runs per case")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, os.cpu_count() or 4],
+                        help="torch intra-op thread counts for the MMS suite")
+    parser.add_argument("--stub-latency-ms", type=float, default=50, help="Simulated provider service time")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown")
+    parser.add_argument("--mms-worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mms_worker is not None:
+        mms_worker(args.mms_worker, args.runs)
+        return 0
+
+    suites = [s.strip() for s in args.suite.split(",") if s.strip()]
+    results = {}
+    if "mms" in suites:
+        results.update(run_mms(args))
+    if "openai" in suites or "gooey" in suites:
+        server, base_url = start_stub(args.stub_latency_ms)
+        try:
+            if "openai" in suites:
+                results.update(run_openai(args, base_url))
+            if "gooey" in suites:
+                results.update(run_gooey(args, base_url))
+        finally:
+            server.shutdown()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "runs": args.runs,
+            "stub_latency_ms": args.stub_latency_ms,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    print(f"{'case':<52} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RTF':>6} {'RSS MB':>8}")
+    for name, row in results.items():
+        if "error" in row:
+            print(f"{name:<52} error: {row['error']}")
+        elif "load_s" in row:
+            print(f"{name:<52} loaded in {row['load_s']:.2f}s {'':>17} {row['peak_rss_mb']:>8.0f}")
+        else:
+            rtf = f"{row['rtf']:.3f}" if "rtf" in row else "-"
+            print(f"{name:<52} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+                  f"{rtf:>6} {row['peak_rss_mb']:>8.0f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for name, metric, before, after in regressions:
+            print(f"REGRESSION {name} {metric}: {before:.2f} -> {after:.2f}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
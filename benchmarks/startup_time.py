@@ -0,0 +1,74 @@
+"""Measure the import cost of the synthesis modules and whether they pull in torch.
+
+Each module is imported in a fresh interpreter, several times, and the
+median wall time is reported together with the heavy packages that ended
+up in sys.modules. tts_engine and batch_tts should load without torch or
+transformers; the torch row shows the cost they avoid until MMS is used.
+
+Usage: python benchmarks/startup_time.py [--runs 5] [--module NAME ...]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["tts_engine", "streaming_tts", "batch_tts", "torch"]
+HEAVY_PACKAGES = ["torch", "transformers", "streamlit"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [p for p in {heavy!r} if p in sys.modules]}}))
+"""
+
+
+def measure(module, runs):
+    """Import module in fresh interpreters and return the timings and loaded packages"""
+    timings = []
+    loaded = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_PACKAGES)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            return {"module": module, "error": result.stderr.strip().splitlines()[-1]}
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(sample["seconds"])
+        loaded = sample["loaded"]
+    return {
+        "module": module,
+        "median_ms": statistics.median(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+        "loaded": loaded,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", action="append", dest="modules",
+                        help="Module to import (repeatable)")
+    args = parser.parse_args()
+
+    rows = [measure(module, args.runs) for module in args.modules or DEFAULT_MODULES]
+
+    print(f"{'module':>16} {'median ms':>10} {'max ms':>10}  heavy packages loaded")
+    for row in rows:
+        if "error" in row:
+            print(f"{row['module']:>16} {'failed':>10} {'':>10}  {row['error']}")
+            continue
+        print(f"{row['module']:>16} {row['median_ms']:>10.0f} {row['max_ms']:>10.0f}  "
+              f"{', '.join(row['loaded']) or '-'}")
+    print(json.dumps(rows))
+
+
+if __name__ == "__main__":
+    main()
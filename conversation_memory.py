@@ -0,0 +1,141 @@
+"""Token-budgeted conversation memory for chat sessions.
+
+Every message is counted once when it is added. Requests are built from the
+system prompt, a running summary of older turns and a sliding window of the
+most recent turns that fits the token budget, so request size stays flat
+however long the session gets. Turns that leave the window are folded into
+the summary in one call, together with the previous summary; the summary is
+cached and only recomputed when more turns roll out.
+"""
+import os
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("CHAT_TOKEN_BUDGET", "3000"))
+DEFAULT_SUMMARY_TOKENS = 300
+# Tokens the chat format adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+# When the window overflows it is trimmed to this share of the budget, so
+# the summary is refreshed every few turns rather than on every turn
+TRIM_TARGET = 0.75
+
+
+def make_token_counter(model="gpt-4"):
+    """Return a function counting tokens for model, estimating if tiktoken is missing"""
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+    # Hebrew often takes a token or more per character; never undercount
+    return lambda text: max(1, len(text))
+
+
+class ConversationMemory:
+    """Sliding window of recent turns plus a cached summary of everything older"""
+
+    def __init__(self, system_prompt="", token_budget=DEFAULT_TOKEN_BUDGET, summarize=None,
+                 summary_tokens=DEFAULT_SUMMARY_TOKENS, model="gpt-4"):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.count_tokens = make_token_counter(model)
+        self.turns = []
+        self.summary = ""
+        self._summary_count = 0
+        self._window_start = 0
+        self.summary_calls = 0
+        self.system_prompt = None
+        self.set_system_prompt(system_prompt)
+
+    def set_system_prompt(self, prompt):
+        if prompt != self.system_prompt:
+            self.system_prompt = prompt
+            self._system_count = self.count_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS
+
+    def set_token_budget(self, token_budget):
+        if token_budget != self.token_budget:
+            self.token_budget = token_budget
+            self._fit()
+
+    def add(self, role, content):
+        """Record a turn, counting its tokens once, and keep the window within budget"""
+        self.turns.append({
+            "role": role,
+            "content": content,
+            "tokens": self.count_tokens(content) + MESSAGE_OVERHEAD_TOKENS,
+        })
+        self._fit()
+
+    def _window_tokens(self):
+        return sum(turn["tokens"] for turn in self.turns[self._window_start:])
+
+    def _fixed_tokens(self):
+        return self._system_count + self._summary_count
+
+    def _fit(self):
+        # A new summary can be longer than the old one, so trim again until the request fits
+        while self._fixed_tokens() + self._window_tokens() > self.token_budget:
+            # Leave room for the summary the evicted turns are folded into
+            summary_room = self._summary_count
+            if self.summarize is not None:
+                summary_room = max(summary_room, self.summary_tokens + MESSAGE_OVERHEAD_TOKENS)
+            target = self.token_budget * TRIM_TARGET - self._system_count - summary_room
+            start = self._window_start
+            tokens = self._window_tokens()
+            # Always keep the latest turn, even if it alone exceeds the budget
+            while start < len(self.turns) - 1 and tokens > target:
+                tokens -= self.turns[start]["tokens"]
+                start += 1
+            if start == self._window_start:
+                return
+            evicted = self.turns[self._window_start:start]
+            self._window_start = start
+            self._roll_into_summary(evicted)
+
+    def _roll_into_summary(self, evicted):
+        if not evicted or self.summarize is None:
+            return
+        try:
+            summary = self.summarize(self.summary, evicted, self.summary_tokens)
+        except Exception:
+            # Keep the previous summary; the evicted turns are simply dropped
+            return
+        self.summary_calls += 1
+        self.summary = summary
+        self._summary_count = self.count_tokens(summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0
+
+    def messages(self):
+        """Messages to send: system prompt, summary of older turns, then the recent window"""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {self.summary}",
+            })
+        messages.extend({"role": t["role"], "content": t["content"]} for t in self.turns[self._window_start:])
+        return messages
+
+    def history(self):
+        """Every turn of the session, for display"""
+        return [{"role": t["role"], "content": t["content"]} for t in self.turns]
+
+    def clear(self):
+        self.turns = []
+        self.summary = ""
+        self._summary_count = 0
+        self._window_start = 0
+
+    def stats(self):
+        return {
+            "turns": len(self.turns),
+            "window_turns": len(self.turns) - self._window_start,
+            "summarized_turns": self._window_start,
+            "request_tokens": self._fixed_tokens() + self._window_tokens(),
+            "token_budget": self.token_budget,
+            "summary_calls": self.summary_calls,
+        }
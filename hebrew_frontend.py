@@ -0,0 +1,201 @@
+"""Hebrew text front-end for the MMS-TTS model.
+
+normalize_hebrew() turns raw input into the text the model is actually
+trained on: niqqud and cantillation marks are removed, Hebrew punctuation
+and typographic quotes and dashes are unified, numbers are spelled out in
+Hebrew words, and characters the tokenizer does not know (Latin letters,
+emoji, symbols) are dropped. Inputs that differ only in these details then
+share one audio cache entry and one token length.
+
+HebrewFrontend memoizes the tokenizer's input ids in a bounded LRU keyed by
+the normalized string, so repeated phrases skip tokenization entirely, and
+keeps hit counts and the tokenization time those hits saved.
+"""
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("MMS_TOKEN_CACHE_ENTRIES", "4096"))
+
+# Cantillation marks and niqqud (U+0591-U+05C7), except the maqaf and the
+# sof pasuq / paseq punctuation handled below
+_NIQQUD = re.compile(r"[\u0591-\u05BD\u05BF\u05C1\u05C2\u05C4\u05C5\u05C7]")
+
+_PUNCTUATION = str.maketrans({
+    "\u05BE": "-",   # maqaf
+    "\u05C0": " ",   # paseq
+    "\u05C3": ".",   # sof pasuq
+    "\u05F3": "'",   # geresh
+    "\u05F4": '"',   # gershayim
+    "\u2018": "'",
+    "\u2019": "'",
+    "\u201A": "'",
+    "\u201C": '"',
+    "\u201D": '"',
+    "\u201E": '"',
+    "\u2013": "-",
+    "\u2014": "-",
+    "\u2026": ".",
+    "\u00A0": " ",
+    "\u200E": "",    # left-to-right mark
+    "\u200F": "",    # right-to-left mark
+})
+
+_HEBREW_LETTERS = "".join(chr(c) for c in range(0x05D0, 0x05EB))
+# Used when no tokenizer vocabulary is available
+_DEFAULT_ALLOWED = frozenset(_HEBREW_LETTERS + " .,?!-'\"")
+
+# A number, optionally glued to a one-letter prefix such as ב- or ו-
+_NUMBER = re.compile(r"(?:(?<![\u05D0-\u05EA])([ובכלמשה])-?)?(\d+(?:[.,]\d+)*)")
+_SPACES = re.compile(r"\s+")
+# Larger numbers are read digit by digit; the scales stop at billions
+MAX_SPELLED_NUMBER = 10 ** 12
+
+_UNITS = ["אפס", "אחת", "שתיים", "שלוש", "ארבע", "חמש", "שש", "שבע", "שמונה", "תשע"]
+_TEENS = ["עשר", "אחת עשרה", "שתים עשרה", "שלוש עשרה", "ארבע עשרה", "חמש עשרה",
+          "שש עשרה", "שבע עשרה", "שמונה עשרה", "תשע עשרה"]
+# Masculine forms count thousands above ten, millions and billions: אחד עשר אלף
+_UNITS_MASCULINE = ["אפס", "אחד", "שניים", "שלושה", "ארבעה", "חמישה", "שישה", "שבעה", "שמונה", "תשעה"]
+_TEENS_MASCULINE = ["עשרה", "אחד עשר", "שנים עשר", "שלושה עשר", "ארבעה עשר", "חמישה עשר",
+                    "שישה עשר", "שבעה עשר", "שמונה עשר", "תשעה עשר"]
+_TENS = ["", "", "עשרים", "שלושים", "ארבעים", "חמישים", "שישים", "שבעים", "שמונים", "תשעים"]
+_HUNDREDS = ["", "מאה", "מאתיים", "שלוש מאות", "ארבע מאות", "חמש מאות", "שש מאות",
+             "שבע מאות", "שמונה מאות", "תשע מאות"]
+_THOUSANDS = ["", "אלף", "אלפיים", "שלושת אלפים", "ארבעת אלפים", "חמשת אלפים", "ששת אלפים",
+              "שבעת אלפים", "שמונת אלפים", "תשעת אלפים", "עשרת אלפים"]
+
+
+def _below_thousand(n, masculine=False):
+    """Word groups for 0 < n < 1000, e.g. 125 -> ["מאה", "עשרים", "חמש"]"""
+    units, teens = (_UNITS_MASCULINE, _TEENS_MASCULINE) if masculine else (_UNITS, _TEENS)
+    parts = []
+    if n >= 100:
+        parts.append(_HUNDREDS[n // 100])
+        n %= 100
+    if n >= 20:
+        parts.append(_TENS[n // 10])
+        n %= 10
+    if n >= 10:
+        parts.append(teens[n - 10])
+    elif n:
+        parts.append(units[n])
+    return parts
+
+
+def _join(parts):
+    if len(parts) > 1:
+        # The last group takes the conjunction: מאה עשרים וחמש
+        parts = parts[:-1] + ["ו" + parts[-1]]
+    return " ".join(parts)
+
+
+def number_to_hebrew(n):
+    """Spell out a non-negative integer in Hebrew (counting form)"""
+    if n == 0:
+        return _UNITS[0]
+    if n >= MAX_SPELLED_NUMBER:
+        # Card, account and ID numbers are read digit by digit
+        return " ".join(_UNITS[int(digit)] for digit in str(n))
+    parts = []
+    for scale, singular, dual in ((10 ** 9, "מיליארד", "שני מיליארד"), (10 ** 6, "מיליון", "שני מיליון")):
+        count, n = divmod(n, scale)
+        if count == 1:
+            parts.append(singular)
+        elif count == 2:
+            parts.append(dual)
+        elif count:
+            parts.append(_join(_below_thousand(count, masculine=True)) + " " + singular)
+    count, n = divmod(n, 1000)
+    if count <= 10:
+        if count:
+            parts.append(_THOUSANDS[count])
+    else:
+        parts.append(_join(_below_thousand(count, masculine=True)) + " אלף")
+    parts.extend(_below_thousand(n))
+    return _join(parts)
+
+
+def _spell_number(match):
+    prefix, token = match.group(1) or "", match.group(2)
+    # "1,250" groups thousands; "3.5" or "3,5" is a decimal
+    if re.fullmatch(r"\d{1,3}(?:,\d{3})+", token):
+        return " " + prefix + number_to_hebrew(int(token.replace(",", ""))) + " "
+    whole, _, fraction = token.replace(",", ".").partition(".")
+    words = number_to_hebrew(int(whole))
+    if fraction:
+        fraction = fraction.replace(".", "")
+        # Leading zeros are read digit by digit: 3.05 -> שלוש נקודה אפס חמש
+        zeros = len(fraction) - len(fraction.lstrip("0"))
+        tail = [_UNITS[0]] * zeros + ([number_to_hebrew(int(fraction))] if fraction.strip("0") else [])
+        words += " נקודה " + " ".join(tail)
+    return " " + prefix + words + " "
+
+
+def normalize_hebrew(text, allowed=None):
+    """Normalize Hebrew text for MMS: strip niqqud, spell out numbers, drop unknown characters"""
+    text = unicodedata.normalize("NFD", text)
+    text = _NIQQUD.sub("", text)
+    text = unicodedata.normalize("NFC", text).translate(_PUNCTUATION)
+    text = text.replace("%", " אחוז ")
+    text = _NUMBER.sub(_spell_number, text)
+    allowed = _DEFAULT_ALLOWED if allowed is None else allowed
+    text = "".join(c if c in allowed else " " for c in text.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+class HebrewFrontend:
+    """Normalizes text and memoizes tokenizer input ids in a bounded LRU"""
+
+    def __init__(self, tokenizer, max_entries=DEFAULT_MAX_ENTRIES):
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        vocab = tokenizer.get_vocab() if hasattr(tokenizer, "get_vocab") else {}
+        chars = {token for token in vocab if len(token) == 1}
+        # Spaces, and the punctuation the model knows, survive normalization
+        self.allowed = frozenset(chars | {" "}) if chars else _DEFAULT_ALLOWED
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tokenize_seconds = 0.0
+
+    def normalize(self, text):
+        return normalize_hebrew(text, self.allowed)
+
+    def encode(self, text):
+        """Return the input ids for text, tokenizing only on a cache miss"""
+        normalized = self.normalize(text)
+        with self._lock:
+            ids = self._ids.get(normalized)
+            if ids is not None:
+                self._ids.move_to_end(normalized)
+                self.hits += 1
+                return ids
+
+        start = time.perf_counter()
+        ids = self.tokenizer(text=normalized).input_ids
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.misses += 1
+            self.tokenize_seconds += elapsed
+            self._ids[normalized] = ids
+            while len(self._ids) > self.max_entries:
+                self._ids.popitem(last=False)
+        return ids
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_ms = self.tokenize_seconds / self.misses * 1000 if self.misses else 0.0
+            return {
+                "entries": len(self._ids),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "avg_tokenize_ms": avg_ms,
+                # Each hit skipped one tokenizer call of average cost
+                "saved_ms": self.hits * avg_ms,
+            }
@@ -0,0 +1,258 @@
+"""Pooled, retrying HTTP transport shared by every outbound call.
+
+One requests.Session with a keep-alive connection pool serves the Gooey.ai
+and video download traffic, and one tuned OpenAI client serves the OpenAI
+calls. Each request gets a per-endpoint timeout and is retried on connection
+errors and 429/5xx responses with jittered exponential backoff that honours
+Retry-After. Non-idempotent requests such as a Gooey submit are only resent
+when they never reached the server or were rejected with 429, so a render
+the server already accepted is not started twice. A per-provider semaphore bounds concurrency, and in-flight
+counts, retries and latency percentiles are kept per provider.
+
+Both clients can be replaced with set_http_client and set_openai_client, so
+tests and benchmarks can point them at a local fake server.
+"""
+import email.utils
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# A server that answered these may already have acted on the request
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# (connect, read) timeouts in seconds per logical endpoint
+DEFAULT_TIMEOUTS = {
+    "default": (5, 30),
+    "gooey.submit": (5, 60),
+    "gooey.status": (5, 15),
+    "video.download": (5, 60),
+}
+
+DEFAULT_CONCURRENCY = {
+    "default": 16,
+    "openai": int(os.environ.get("OPENAI_MAX_CONCURRENCY", "8")),
+    "gooey": int(os.environ.get("GOOEY_MAX_CONCURRENCY", "4")),
+}
+
+LATENCY_WINDOW = 1024
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds requested by a Retry-After header, if any"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def never_sent(error):
+    """True when a request failed before a connection was made, so resending it cannot duplicate it"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # requests wraps urllib3's MaxRetryError, whose reason is the underlying failure
+    cause = error.args[0] if error.args else None
+    return isinstance(getattr(cause, "reason", cause), NewConnectionError)
+
+
+class _ProviderState:
+    def __init__(self, limit):
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.limit = limit
+        self.in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+
+class HttpClient:
+    """Connection-pooled session with timeouts, retries, concurrency limits and metrics"""
+
+    def __init__(self, session=None, timeouts=None, concurrency=None, max_retries=3,
+                 backoff_base=0.5, backoff_max=20.0, pool_maxsize=32):
+        self.session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def _provider(self, name):
+        with self._lock:
+            state = self._providers.get(name)
+            if state is None:
+                limit = self.concurrency.get(name, self.concurrency["default"])
+                state = self._providers[name] = _ProviderState(limit)
+            return state
+
+    def timeout_for(self, endpoint):
+        return self.timeouts.get(endpoint, self.timeouts["default"])
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given retry attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @contextmanager
+    def slot(self, provider):
+        """Hold one of the provider's concurrency slots and record the call's latency"""
+        state = self._provider(provider)
+        with state.semaphore:
+            with self._lock:
+                state.in_flight += 1
+                state.requests += 1
+            start = time.perf_counter()
+            try:
+                yield
+            except Exception:
+                with self._lock:
+                    state.errors += 1
+                raise
+            finally:
+                with self._lock:
+                    state.in_flight -= 1
+                    state.latencies.append(time.perf_counter() - start)
+
+    def record_retry(self, provider):
+        state = self._provider(provider)
+        with self._lock:
+            state.retries += 1
+
+    def request(self, method, url, provider="default", endpoint="default", retry=True, **kwargs):
+        """Send a request, retrying connection errors and 429/5xx responses
+
+        Non-idempotent methods are only retried when the connection could not
+        be made or the server answered 429.
+        """
+        kwargs.setdefault("timeout", self.timeout_for(endpoint))
+        attempts = self.max_retries + 1 if retry else 1
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_statuses = RETRY_STATUSES if idempotent else {429}
+        for attempt in range(attempts):
+            try:
+                with self.slot(provider):
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == attempts - 1 or not (idempotent or never_sent(e)):
+                    raise
+                delay = self.backoff(attempt)
+            else:
+                if response.status_code not in retry_statuses or attempt == attempts - 1:
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = min(self.backoff_max, retry_after) if retry_after is not None else self.backoff(attempt)
+                response.close()
+            self.record_retry(provider)
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def metrics(self):
+        """Return in-flight, request, retry and error counts plus p50/p95 latency per provider"""
+        with self._lock:
+            snapshot = {
+                name: (state.limit, state.in_flight, state.requests, state.retries,
+                       state.errors, sorted(state.latencies))
+                for name, state in self._providers.items()
+            }
+        metrics = {}
+        for name, (limit, in_flight, count, retries, errors, latencies) in snapshot.items():
+            metrics[name] = {
+                "limit": limit,
+                "in_flight": in_flight,
+                "requests": count,
+                "retries": retries,
+                "errors": errors,
+                "p50_ms": _percentile(latencies, 0.50) * 1000,
+                "p95_ms": _percentile(latencies, 0.95) * 1000,
+            }
+        return metrics
+
+
+_http_client = None
+_openai_client = None
+_clients_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide HTTP client"""
+    global _http_client
+    with _clients_lock:
+        if _http_client is None:
+            _http_client = HttpClient()
+        return _http_client
+
+
+def set_http_client(client):
+    """Replace the process-wide HTTP client, e.g. with one aimed at a fake server"""
+    global _http_client
+    with _clients_lock:
+        _http_client = client
+
+
+def get_openai_client():
+    """Return the process-wide OpenAI client with a pooled keep-alive transport
+
+    The API key comes from openai.api_key, which the pages set from their
+    secrets, or from OPENAI_API_KEY; OPENAI_BASE_URL redirects it to another
+    server.
+    """
+    global _openai_client
+    with _clients_lock:
+        if _openai_client is None:
+            import httpx
+            import openai
+
+            def count_retryable(response):
+                # The SDK retries these itself; surface them in the shared metrics
+                if response.status_code in RETRY_STATUSES:
+                    get_http_client().record_retry("openai")
+
+            limit = DEFAULT_CONCURRENCY["openai"]
+            _openai_client = openai.OpenAI(
+                api_key=openai.api_key or os.environ.get("OPENAI_API_KEY"),
+                max_retries=3,
+                timeout=httpx.Timeout(60.0, connect=5.0),
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+                    event_hooks={"response": [count_retryable]},
+                ),
+            )
+        return _openai_client
+
+
+def set_openai_client(client):
+    """Replace the process-wide OpenAI client"""
+    global _openai_client
+    with _clients_lock:
+        _openai_client = client
@@ -0,0 +1,206 @@
+"""Persistent cache of lipsync renders keyed by face asset and request.
+
+A Wav2Lip render costs minutes and Gooey credits, and demos ask for the
+same face and text again and again. Each request is keyed by a SHA-256 of
+the face image or video bytes together with every other payload field
+(text, voice, TTS model, face padding, lipsync model), so a cached render
+is only reused when nothing that shapes the output changed.
+
+A key first points at the job submitted for it, so a second identical
+request while the first is still rendering follows that job instead of
+starting another. Once the job has completed, its output URL and result
+are copied into the cache and served without calling Gooey. Rendered MP4s
+can also be kept locally; entries expire after LIPSYNC_CACHE_TTL_HOURS,
+and the least recently used local videos are deleted once they exceed
+LIPSYNC_CACHE_MAX_MB.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import partial
+
+from lipsync_jobs import ACTIVE_STATUSES, DEFAULT_DB_PATH
+from singleflight import get_singleflight
+from video_download import download_file
+
+CACHE_TTL = float(os.environ.get("LIPSYNC_CACHE_TTL_HOURS", "168")) * 3600
+MAX_VIDEO_BYTES = int(os.environ.get("LIPSYNC_CACHE_MAX_MB", "2048")) * 1024 * 1024
+DEFAULT_VIDEO_DIR = os.environ.get(
+    "LIPSYNC_CACHE_VIDEO_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "lipsync-videos"),
+)
+# Faces travel in the payload itself on the image page; they are keyed by hash instead
+_FACE_FIELDS = ("input_face",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lipsync_cache (
+    key TEXT PRIMARY KEY,
+    face_hash TEXT NOT NULL,
+    job_id TEXT,
+    output_url TEXT,
+    result TEXT,
+    video_path TEXT,
+    video_bytes INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+)
+"""
+
+
+def face_hash(face_bytes):
+    return hashlib.sha256(face_bytes).hexdigest()
+
+
+def lipsync_cache_key(face_bytes, payload):
+    """Key a render by the face content and every payload field that shapes the output"""
+    request = {name: value for name, value in payload.items() if name not in _FACE_FIELDS}
+    material = json.dumps({"face": face_hash(face_bytes), "request": request}, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class LipsyncCache:
+    """SQLite-backed render cache with TTL expiry and a size cap on local videos"""
+
+    def __init__(self, path=DEFAULT_DB_PATH, video_dir=DEFAULT_VIDEO_DIR, ttl=CACHE_TTL,
+                 max_video_bytes=MAX_VIDEO_BYTES):
+        self.path = path
+        self.video_dir = video_dir
+        self.ttl = ttl
+        self.max_video_bytes = max_video_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _delete(self, conn, row):
+        if row["video_path"]:
+            _remove(row["video_path"])
+        conn.execute("DELETE FROM lipsync_cache WHERE key = ?", (row["key"],))
+
+    def lookup(self, key, manager):
+        """Return the id of a completed or in-flight job for key, or None on a miss"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM lipsync_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row["created_at"] + self.ttl < now:
+                self._delete(conn, row)
+                return None
+
+            job = manager.get(row["job_id"]) if row["job_id"] else None
+            if job is not None and job["status"] in ACTIVE_STATUSES:
+                # The same render is already running; follow it instead of submitting again
+                return job["id"]
+            if job is not None and job["status"] == "completed" and job["output_url"]:
+                conn.execute(
+                    "UPDATE lipsync_cache SET output_url = ?, result = ?, hits = hits + 1, last_used_at = ? "
+                    "WHERE key = ?",
+                    (job["output_url"], json.dumps(job["result"]), now, key),
+                )
+                return job["id"]
+            if row["output_url"] is None:
+                # The job failed or was never completed
+                self._delete(conn, row)
+                return None
+
+            # The job record is gone, but the cache kept its output: restore it as a finished job
+            job_id = manager.store.create(owner="lipsync-cache")
+            manager.store.update(
+                job_id,
+                status="completed",
+                output_url=row["output_url"],
+                result=row["result"],
+            )
+            conn.execute(
+                "UPDATE lipsync_cache SET job_id = ?, hits = hits + 1, last_used_at = ? WHERE key = ?",
+                (job_id, now, key),
+            )
+            return job_id
+
+    def remember(self, key, face_bytes, job_id):
+        """Point key at a newly submitted job"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO lipsync_cache (key, face_hash, job_id, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, face_hash(face_bytes), job_id, now, now),
+            )
+        self.evict()
+
+    def local_video(self, url, job_id):
+        """Return a local path for job_id's rendered video, downloading it into the cache once"""
+        path = os.path.join(self.video_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".mp4")
+        # Sessions showing the same video share one download, so only one writer touches its partial file
+        get_singleflight().do(f"video:{path}", partial(download_file, url, path=path))
+        with self._connect() as conn:
+            # A first render's entry only knows its job; record the output here as well
+            conn.execute(
+                "UPDATE lipsync_cache SET output_url = ?, video_path = ?, video_bytes = ?, last_used_at = ? "
+                "WHERE job_id = ? OR output_url = ?",
+                (url, path, os.path.getsize(path), time.time(), job_id, url),
+            )
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Drop expired entries, then the least recently used local videos above the size cap"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            for row in conn.execute("SELECT * FROM lipsync_cache WHERE created_at < ?", (now - self.ttl,)).fetchall():
+                self._delete(conn, row)
+            total = conn.execute("SELECT COALESCE(SUM(video_bytes), 0) FROM lipsync_cache").fetchone()[0]
+            if total <= self.max_video_bytes:
+                return
+            rows = conn.execute(
+                "SELECT * FROM lipsync_cache WHERE video_path IS NOT NULL ORDER BY last_used_at"
+            ).fetchall()
+            for row in rows:
+                if total <= self.max_video_bytes:
+                    break
+                if row["video_path"] == keep:
+                    continue
+                # The output URL stays cached; only the local copy goes
+                _remove(row["video_path"])
+                conn.execute(
+                    "UPDATE lipsync_cache SET video_path = NULL, video_bytes = 0 WHERE key = ?", (row["key"],)
+                )
+                total -= row["video_bytes"]
+
+    def stats(self):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(video_bytes), 0) FROM lipsync_cache"
+            ).fetchone()
+        return {"entries": row[0], "hits": row[1], "video_bytes": row[2]}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_lipsync_cache():
+    """Return the process-wide lipsync cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LipsyncCache()
+        return _cache
@@ -0,0 +1,295 @@
+"""Asynchronous Gooey.ai lipsync jobs backed by a local SQLite store.
+
+Jobs are submitted through Gooey's async run endpoint, which answers
+immediately with a status URL instead of holding the request open for the
+whole Wav2Lip render. A single background poller per process follows every
+in-flight job with exponential backoff and writes its state to SQLite, so a
+page only reads the store and can reconnect to a job after a rerun or a
+browser refresh. A job that can no longer finish is marked failed: Gooey
+rejected its status request with a 4xx, it has no status URL to follow, its
+submission never completed, or it ran past LIPSYNC_JOB_MAX_AGE_MINUTES.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+import requests
+
+from http_client import get_http_client
+from tracing import span
+
+GOOEY_API_BASE = os.environ.get("GOOEY_API_BASE", "https://api.gooey.ai")
+DEFAULT_DB_PATH = os.environ.get(
+    "LIPSYNC_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "lipsync.sqlite3"),
+)
+
+ACTIVE_STATUSES = ("submitting", "starting", "running")
+TERMINAL_STATUSES = ("completed", "failed")
+
+POLL_INITIAL_DELAY = 2.0
+POLL_MAX_DELAY = 30.0
+POLL_IDLE_SLEEP = 1.0
+JOB_MAX_AGE = float(os.environ.get("LIPSYNC_JOB_MAX_AGE_MINUTES", "60")) * 60
+# Longer than a submit can take with its retries; an older "submitting" row crashed mid-submit
+SUBMIT_TIMEOUT = 300.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lipsync_jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT,
+    run_id TEXT,
+    status_url TEXT,
+    web_url TEXT,
+    status TEXT NOT NULL,
+    detail TEXT,
+    output_url TEXT,
+    result TEXT,
+    poll_count INTEGER NOT NULL DEFAULT 0,
+    next_poll_at REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def extract_output_url(result):
+    """Find the rendered video URL in a Gooey response or status payload"""
+    if not result:
+        return None
+    if result.get("output_url"):
+        return result["output_url"]
+    output = result.get("output") or {}
+    return output.get("output_video") or output.get("output_url")
+
+
+class LipsyncJobStore:
+    """SQLite persistence for lipsync job state"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, owner=None):
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO lipsync_jobs (id, owner, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, owner, "submitting", now, now),
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        if "result" in fields and not isinstance(fields["result"], (str, type(None))):
+            fields["result"] = json.dumps(fields["result"])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE lipsync_jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM lipsync_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def due(self, now=None):
+        """Return in-flight jobs whose next poll is due"""
+        now = time.time() if now is None else now
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM lipsync_jobs WHERE status IN ('starting', 'running') "
+                "AND status_url IS NOT NULL AND next_poll_at <= ? ORDER BY next_poll_at",
+                (now,),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def expire(self, now=None, max_age=JOB_MAX_AGE, submit_timeout=SUBMIT_TIMEOUT):
+        """Fail in-flight jobs that can no longer finish"""
+        now = time.time() if now is None else now
+        with self._connect() as conn:
+            for detail, condition, params in (
+                ("The submission did not complete", "status = 'submitting' AND created_at < ?",
+                 (now - submit_timeout,)),
+                ("Gooey returned no status URL to follow",
+                 "status IN ('starting', 'running') AND status_url IS NULL", ()),
+                (f"No result after {max_age / 60:.0f} minutes",
+                 "status IN ('starting', 'running') AND created_at < ?", (now - max_age,)),
+            ):
+                conn.execute(
+                    f"UPDATE lipsync_jobs SET status = 'failed', detail = ?, updated_at = ? WHERE {condition}",
+                    (detail, now, *params),
+                )
+
+    def next_poll_at(self):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT MIN(next_poll_at) FROM lipsync_jobs WHERE status IN ('starting', 'running')"
+            ).fetchone()
+        return row[0]
+
+    def for_owner(self, owner, limit=20):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM lipsync_jobs WHERE owner = ? ORDER BY created_at DESC LIMIT ?",
+                (owner, limit),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+def is_permanent(error):
+    """True for a 4xx answer that retrying will not change (other than 408 and 429)"""
+    response = getattr(error, "response", None)
+    return (isinstance(error, requests.HTTPError) and response is not None
+            and 400 <= response.status_code < 500 and response.status_code not in (408, 429))
+
+
+def backoff_delay(poll_count, initial=POLL_INITIAL_DELAY, maximum=POLL_MAX_DELAY):
+    """Exponential backoff with full jitter for the next status poll"""
+    return random.uniform(initial, min(maximum, initial * 2 ** poll_count))
+
+
+class LipsyncJobManager:
+    """Submits lipsync jobs and polls them to completion on a background thread"""
+
+    def __init__(self, api_key, base_url=GOOEY_API_BASE, store=None, http=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.store = store or LipsyncJobStore()
+        self.http = http or get_http_client()
+        self._wakeup = threading.Event()
+        self._poller = threading.Thread(target=self._poll_forever, name="lipsync-poller", daemon=True)
+        self._poller.start()
+
+    @property
+    def _headers(self):
+        return {"Authorization": "bearer " + self.api_key}
+
+    def submit(self, payload, files=None, owner=None):
+        """Start a LipsyncTTS run and return the local job id without waiting for the render"""
+        job_id = self.store.create(owner=owner)
+        try:
+            with span("gooey.submit"):
+                if files:
+                    response = self.http.post(
+                        f"{self.base_url}/v3/LipsyncTTS/async/form/",
+                        provider="gooey",
+                        endpoint="gooey.submit",
+                        headers=self._headers,
+                        files=files,
+                        data={"json": json.dumps(payload)},
+                    )
+                else:
+                    response = self.http.post(
+                        f"{self.base_url}/v3/LipsyncTTS/async/",
+                        provider="gooey",
+                        endpoint="gooey.submit",
+                        headers=self._headers,
+                        json=payload,
+                    )
+                response.raise_for_status()
+                result = response.json()
+        except Exception as e:
+            self.store.update(job_id, status="failed", detail=str(e))
+            raise
+
+        self.store.update(
+            job_id,
+            status="starting",
+            run_id=result.get("run_id"),
+            status_url=result.get("status_url") or response.headers.get("Location"),
+            web_url=result.get("web_url"),
+            next_poll_at=time.time() + POLL_INITIAL_DELAY,
+        )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def poll(self, job):
+        """Fetch the status of one job and record it"""
+        poll_count = job["poll_count"] + 1
+        try:
+            with span("gooey.poll"):
+                response = self.http.get(
+                    job["status_url"],
+                    provider="gooey",
+                    endpoint="gooey.status",
+                    headers=self._headers,
+                )
+                response.raise_for_status()
+                result = response.json()
+        except Exception as e:
+            if is_permanent(e):
+                # The run is gone or the key was rejected; polling again cannot succeed
+                self.store.update(job["id"], status="failed", detail=str(e), poll_count=poll_count)
+                return
+            # Transient failures only push the next poll further out
+            self.store.update(
+                job["id"],
+                detail=str(e),
+                poll_count=poll_count,
+                next_poll_at=time.time() + backoff_delay(poll_count),
+            )
+            return
+
+        status = result.get("status", job["status"])
+        fields = {
+            "status": status,
+            "detail": result.get("detail"),
+            "poll_count": poll_count,
+            "next_poll_at": time.time() + backoff_delay(poll_count),
+        }
+        if status in TERMINAL_STATUSES:
+            fields["result"] = result
+            fields["output_url"] = extract_output_url(result)
+        self.store.update(job["id"], **fields)
+
+    def _poll_forever(self):
+        while True:
+            try:
+                self.store.expire()
+                for job in self.store.due():
+                    self.poll(job)
+                next_poll_at = self.store.next_poll_at()
+            except sqlite3.Error:
+                # A locked or briefly unavailable store is retried on the next pass
+                next_poll_at = time.time() + POLL_IDLE_SLEEP
+            delay = POLL_IDLE_SLEEP * 10 if next_poll_at is None else next_poll_at - time.time()
+            self._wakeup.wait(max(POLL_IDLE_SLEEP / 10, min(delay, POLL_MAX_DELAY)))
+            self._wakeup.clear()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_job_manager(api_key, base_url=GOOEY_API_BASE):
+    """Return the process-wide job manager for an API key and endpoint"""
+    with _managers_lock:
+        manager = _managers.get((api_key, base_url))
+        if manager is None:
+            manager = LipsyncJobManager(api_key, base_url=base_url)
+            _managers[(api_key, base_url)] = manager
+        return manager
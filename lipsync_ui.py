@@ -0,0 +1,52 @@
+"""Streamlit views for lipsync jobs, shared by the lipsync pages.
+
+The job id is kept in the session and in the URL query string, so a page
+that reruns or is reloaded reconnects to its in-flight render instead of
+starting a new one.
+"""
+import time
+
+import streamlit as st
+
+from lipsync_jobs import ACTIVE_STATUSES
+
+JOB_QUERY_PARAM = "job"
+POLL_INTERVAL_SECONDS = 2
+
+
+def track_job(job_id):
+    """Remember the job of this page across reruns and reloads"""
+    st.session_state.lipsync_job = job_id
+    st.query_params[JOB_QUERY_PARAM] = job_id
+
+
+def current_job_id():
+    return st.session_state.get("lipsync_job") or st.query_params.get(JOB_QUERY_PARAM)
+
+
+@st.fragment(run_every=POLL_INTERVAL_SECONDS)
+def _job_progress(manager, job_id):
+    """Re-read the job from the local store until the background poller finishes it"""
+    job = manager.get(job_id)
+    if job is None or job["status"] not in ACTIVE_STATUSES:
+        st.rerun()
+    elapsed = time.time() - job["created_at"]
+    st.info(f"Processing... status: {job['status']} · {elapsed:.0f}s elapsed. This may take a few minutes.")
+    if job["web_url"]:
+        st.caption(f"[Follow this run on Gooey.ai]({job['web_url']})")
+
+
+def show_job(manager, job_id, render_result):
+    """Show progress for an in-flight job, or its result once it has finished"""
+    job = manager.get(job_id)
+    if job is None:
+        return
+    if job["status"] in ACTIVE_STATUSES:
+        _job_progress(manager, job_id)
+    elif job["status"] == "completed":
+        st.success("Processing complete!")
+        render_result(job)
+    else:
+        st.error("Failed to process the video. Please try again.")
+        if job["detail"]:
+            st.error(f"Error: {job['detail']}")
@@ -0,0 +1,209 @@
+"""Offline, versioned MMS-TTS model artifact with a memory-mapped fast load.
+
+`python mms_artifact.py export` downloads facebook/mms-tts-heb once and
+writes the config, tokenizer and safetensors weights into
+<root>/<version>/, where the version is a prefix of the weights' SHA-256,
+plus a manifest and a LATEST pointer in <root>. The root defaults to
+.cache/mms-artifact and is set with MMS_ARTIFACT_DIR.
+
+load_artifact() never touches the Hugging Face hub. It builds the model on
+the meta device, so no weights are allocated or randomly initialized, then
+maps the safetensors file copy-on-write and assigns each parameter as a
+zero-copy view into the mapping. Weight pages are read on demand from the
+OS page cache and are shared by every process that maps the same file, so
+extra app replicas and MMS server workers add no resident weight memory
+until they write to a page, which inference never does.
+
+benchmarks/model_load.py measures load time and RSS for the hub and
+artifact paths.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import time
+
+MODEL_ID = "facebook/mms-tts-heb"
+ARTIFACT_DIR = os.environ.get(
+    "MMS_ARTIFACT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "mms-artifact"),
+)
+ARTIFACT_FORMAT = 1
+WEIGHTS_FILE = "model.safetensors"
+MANIFEST_FILE = "manifest.json"
+
+# safetensors dtype names -> torch dtype attribute names
+_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+class ArtifactError(Exception):
+    """Raised when a model artifact is missing, incomplete or does not match its manifest"""
+
+
+def _sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def export_artifact(model_id=MODEL_ID, root=ARTIFACT_DIR):
+    """Download model_id, write it as a versioned artifact under root and return its directory"""
+    import torch
+    import transformers
+    from transformers import AutoTokenizer, VitsModel
+
+    staging = os.path.join(root, f".staging-{os.getpid()}")
+    model = VitsModel.from_pretrained(model_id)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model.save_pretrained(staging, safe_serialization=True)
+    tokenizer.save_pretrained(staging)
+
+    weights = os.path.join(staging, WEIGHTS_FILE)
+    if not os.path.exists(weights):
+        raise ArtifactError(f"{model_id} was not saved as a single {WEIGHTS_FILE}")
+    sha256 = _sha256(weights)
+    version = sha256[:12]
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "model_id": model_id,
+        "version": version,
+        "weights_sha256": sha256,
+        "weights_bytes": os.path.getsize(weights),
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+        "created_at": time.time(),
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    path = os.path.join(root, version)
+    if os.path.exists(path):
+        # Identical weights were exported before; keep that copy
+        shutil.rmtree(staging)
+    else:
+        os.replace(staging, path)
+    with open(os.path.join(root, "LATEST.tmp"), "w") as f:
+        f.write(version)
+    os.replace(os.path.join(root, "LATEST.tmp"), os.path.join(root, "LATEST"))
+    return path
+
+
+def resolve_artifact(path=ARTIFACT_DIR):
+    """Return the artifact directory for path (an artifact or a root with LATEST), or None"""
+    if not path:
+        return None
+    if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        return path
+    latest = os.path.join(path, "LATEST")
+    if os.path.exists(latest):
+        with open(latest) as f:
+            version = f.read().strip()
+        if os.path.exists(os.path.join(path, version, MANIFEST_FILE)):
+            return os.path.join(path, version)
+    return None
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def verify_artifact(path):
+    """Check the weights against the manifest's SHA-256; reads the whole file"""
+    manifest = read_manifest(path)
+    sha256 = _sha256(os.path.join(path, WEIGHTS_FILE))
+    if sha256 != manifest["weights_sha256"]:
+        raise ArtifactError(f"{path}: weights do not match the manifest ({sha256[:12]} != {manifest['version']})")
+    return manifest
+
+
+def mmap_safetensors(path):
+    """Return {name: tensor} whose data are views into a copy-on-write mapping of path"""
+    import torch
+
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+    header.pop("__metadata__", None)
+
+    # shared=False maps the file MAP_PRIVATE: pages come from the page cache
+    # and are shared across processes, and a stray write cannot reach the file
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=size)
+    data = torch.empty(0, dtype=torch.uint8).set_(storage)
+    base = 8 + header_size
+    tensors = {}
+    for name, entry in header.items():
+        dtype = getattr(torch, _DTYPES[entry["dtype"]])
+        start, end = entry["data_offsets"]
+        raw = data[base + start:base + end]
+        if (base + start) % dtype.itemsize:
+            # Views must be aligned to the element size; copy the odd one out
+            raw = raw.clone()
+        tensors[name] = raw.view(dtype).reshape(entry["shape"])
+    return tensors
+
+
+def load_artifact(path):
+    """Load (model, tokenizer, manifest) from an artifact directory without network access"""
+    import torch
+    from transformers import AutoTokenizer, VitsConfig, VitsModel
+
+    manifest = read_manifest(path)
+    weights = os.path.join(path, WEIGHTS_FILE)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ArtifactError(f"{path}: unsupported artifact format {manifest.get('format')}")
+    if os.path.getsize(weights) != manifest["weights_bytes"]:
+        raise ArtifactError(f"{path}: {WEIGHTS_FILE} is truncated")
+
+    config = VitsConfig.from_pretrained(path, local_files_only=True)
+    tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+    with torch.device("meta"):
+        model = VitsModel(config)
+    _, unexpected = model.load_state_dict(mmap_safetensors(weights), strict=False, assign=True)
+    left_on_meta = [name for name, t in [*model.named_parameters(), *model.named_buffers()] if t.is_meta]
+    if unexpected or left_on_meta:
+        # Tensors not stored in the state dict (e.g. non-persistent buffers)
+        # cannot be rebuilt from the file; take the regular, copying load
+        model = VitsModel.from_pretrained(path, local_files_only=True)
+        manifest = dict(manifest, mmap=False)
+    else:
+        manifest = dict(manifest, mmap=True)
+    # Report the hub id, not the local path, so audio cache keys match hub loads
+    model.config.name_or_path = manifest["model_id"]
+    model.eval()
+    return model, tokenizer, manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or inspect the offline MMS-TTS model artifact")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Download the model and write a new artifact version")
+    export.add_argument("--model-id", default=MODEL_ID)
+    export.add_argument("--root", default=ARTIFACT_DIR)
+    show = sub.add_parser("show", help="Print the manifest of the current artifact")
+    show.add_argument("--root", default=ARTIFACT_DIR)
+    show.add_argument("--verify", action="store_true", help="Also check the weights' SHA-256")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        path = export_artifact(args.model_id, args.root)
+        print(f"Exported {args.model_id} to {path}")
+        print(f"Apps load it from MMS_ARTIFACT_DIR={os.path.abspath(args.root)}")
+    else:
+        path = resolve_artifact(args.root)
+        if path is None:
+            raise SystemExit(f"No artifact under {args.root}; run `python mms_artifact.py export` first")
+        manifest = verify_artifact(path) if args.verify else read_manifest(path)
+        print(json.dumps(dict(manifest, path=path), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Batched, length-bucketed inference engine for the MMS VITS model.
+
+Concurrent mms_tts calls are collected over a short window, normalized and
+tokenized through the Hebrew front-end, sorted into buckets of similar token
+length, padded and run through the model in one forward pass per bucket.
+Each waveform is then cut back to its own length, which VITS derives from
+the attention-masked duration predictions.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from hebrew_frontend import HebrewFrontend
+from tracing import span
+
+DEFAULT_MAX_BATCH = int(os.environ.get("MMS_MAX_BATCH", "8"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("MMS_MAX_WAIT_MS", "25"))
+DEFAULT_BUCKET_WIDTH = int(os.environ.get("MMS_BUCKET_WIDTH", "64"))
+
+
+def bucket_by_length(lengths, bucket_width=DEFAULT_BUCKET_WIDTH, max_batch=DEFAULT_MAX_BATCH):
+    """Group indices into batches of similar length, each at most max_batch long"""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets = []
+    current = []
+    current_bucket = None
+    for i in order:
+        bucket = lengths[i] // bucket_width
+        if current and (bucket != current_bucket or len(current) >= max_batch):
+            buckets.append(current)
+            current = []
+        current.append(i)
+        current_bucket = bucket
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def run_batch(model, tokenizer, texts, input_ids=None):
+    """Run one padded forward pass and return a float waveform per text
+
+    Pass input_ids to reuse token ids that were already computed for texts.
+    """
+    # Imported here so the batcher can be imported without paying for torch
+    import torch
+
+    if input_ids is not None:
+        inputs = tokenizer.pad({"input_ids": list(input_ids)}, padding=True, return_tensors="pt")
+    else:
+        inputs = tokenizer(text=list(texts), return_tensors="pt", padding=True)
+    with torch.no_grad():
+        output = model(**inputs)
+
+    waveforms = output.waveform
+    # sequence_lengths comes from the durations predicted under the attention
+    # mask, so padded positions never contribute samples to a waveform.
+    lengths = output.sequence_lengths
+    results = []
+    for i in range(len(texts)):
+        length = int(lengths[i]) if lengths is not None else waveforms.shape[-1]
+        results.append(waveforms[i, :length].numpy())
+    return results
+
+
+class _Request:
+    def __init__(self, text):
+        self.text = text
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MMSBatcher:
+    """Background worker that turns concurrent synthesis requests into batched forward passes"""
+
+    def __init__(self, model, tokenizer, max_batch=DEFAULT_MAX_BATCH,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, bucket_width=DEFAULT_BUCKET_WIDTH):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.bucket_width = bucket_width
+        # Normalizes Hebrew input and remembers token ids of repeated phrases
+        self.frontend = HebrewFrontend(tokenizer)
+        self._queue = queue.Queue()
+        self._history = deque(maxlen=256)
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._thread = threading.Thread(target=self._run, name="mms-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def sampling_rate(self):
+        return self.model.config.sampling_rate
+
+    @property
+    def model_id(self):
+        return self.model.config.name_or_path
+
+    def normalize(self, text):
+        return self.frontend.normalize(text)
+
+    def submit(self, text):
+        """Queue text for synthesis and return a Future resolving to a float waveform"""
+        request = _Request(text)
+        self._queue.put(request)
+        return request.future
+
+    def synthesize(self, text, timeout=None):
+        """Synthesize text and block until its waveform is ready"""
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self):
+        """Block for one request, then gather more until the window closes or the batch is full"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return [r for r in batch if r.future.set_running_or_notify_cancel()]
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            if not requests:
+                continue
+            encoded = []
+            with span("mms.tokenize"):
+                for r in requests:
+                    try:
+                        encoded.append((r, self.frontend.encode(r.text)))
+                    except Exception as e:
+                        # Only the request that cannot be encoded fails
+                        r.future.set_exception(e)
+            if not encoded:
+                continue
+            requests = [r for r, _ in encoded]
+            input_ids = [ids for _, ids in encoded]
+            lengths = [len(ids) for ids in input_ids]
+
+            for bucket in bucket_by_length(lengths, self.bucket_width, self.max_batch):
+                members = [requests[i] for i in bucket]
+                start = time.perf_counter()
+                try:
+                    with span("mms.forward"):
+                        waveforms = run_batch(self.model, self.tokenizer, [r.text for r in members],
+                                              input_ids=[input_ids[i] for i in bucket])
+                except Exception as e:
+                    for r in members:
+                        r.future.set_exception(e)
+                    continue
+                latency = time.perf_counter() - start
+                self._record(members, [lengths[i] for i in bucket], latency)
+                for r, waveform in zip(members, waveforms):
+                    r.future.set_result(waveform)
+
+    def _record(self, members, lengths, latency):
+        now = time.perf_counter()
+        with self._lock:
+            self._batches += 1
+            self._requests += len(members)
+            self._history.append({
+                "size": len(members),
+                "max_tokens": max(lengths),
+                "latency_ms": latency * 1000,
+                "queue_wait_ms": max(now - latency - r.enqueued_at for r in members) * 1000,
+            })
+
+    def stats(self):
+        """Return batch counters and per-batch latency figures for recent batches"""
+        with self._lock:
+            history = list(self._history)
+            stats = {
+                "batches": self._batches,
+                "requests": self._requests,
+                "queued": self._queue.qsize(),
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait_ms,
+            }
+        latencies = sorted(b["latency_ms"] for b in history)
+        stats["avg_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        stats["p50_batch_ms"] = latencies[len(latencies) // 2] if latencies else 0.0
+        stats["p95_batch_ms"] = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+        stats["recent"] = history[-10:]
+        stats["frontend"] = self.frontend.stats()
+        return stats
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(model, tokenizer, **kwargs):
+    """Return the shared batcher for a loaded model, creating it on first use"""
+    with _batchers_lock:
+        batcher = _batchers.get(id(model))
+        if batcher is None or batcher.model is not model:
+            batcher = MMSBatcher(model, tokenizer, **kwargs)
+            _batchers[id(model)] = batcher
+        return batcher
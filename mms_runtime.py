@@ -0,0 +1,173 @@
+"""Process-wide runtime for the MMS-TTS model.
+
+The model is loaded once per process on a background thread, so that the
+cold start happens while the first page renders instead of inside a user
+request. Loading optionally applies dynamic int8 quantization to the linear
+layers, pins torch's intra-op and inter-op thread pools, and finishes with a
+warm-up inference that measures the real-time factor (RTF, seconds of
+compute per second of audio) of the first and of steady-state calls.
+
+torch and transformers are imported on the loader thread, so starting the
+runtime from a page does not block that page on the import either.
+
+When an exported artifact exists (see mms_artifact), the model is mapped from
+its local safetensors file instead of going through the Hugging Face hub.
+MMS_COMPILE=1 wraps the loaded model in torch.compile; the warm-up then also
+pays for the compilation.
+"""
+import os
+import threading
+import time
+
+from mms_artifact import ARTIFACT_DIR, MODEL_ID, load_artifact, resolve_artifact
+
+WARMUP_TEXT = "שלום עולם, זוהי בדיקה של מערכת הדיבור."
+WARMUP_STEADY_RUNS = 3
+
+
+def _env_int(name):
+    value = os.environ.get(name, "")
+    return int(value) if value else None
+
+
+def configure_threads(intra_op_threads=None, inter_op_threads=None):
+    """Apply torch thread-pool sizes; the inter-op pool can only be sized once per process"""
+    import torch
+
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Raised once any inter-op work has run; keep the existing pool
+            pass
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def measure_rtf(model, tokenizer, text=WARMUP_TEXT):
+    """Synthesize text once and return the real-time factor"""
+    from mms_batcher import run_batch
+
+    start = time.perf_counter()
+    waveform = run_batch(model, tokenizer, [text])[0]
+    elapsed = time.perf_counter() - start
+    audio_seconds = len(waveform) / model.config.sampling_rate
+    return elapsed / audio_seconds if audio_seconds else float("inf")
+
+
+def rss_mb():
+    """Resident set size of this process in MB, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class MMSRuntime:
+    """Loads, optimizes and warms up the MMS model on a background thread"""
+
+    def __init__(self, model_id=MODEL_ID, quantize=None, intra_op_threads=None,
+                 inter_op_threads=None, warmup=True, artifact_dir=None, use_compile=None):
+        self.model_id = model_id
+        self.quantize = os.environ.get("MMS_QUANTIZE", "0") == "1" if quantize is None else quantize
+        self.compile = os.environ.get("MMS_COMPILE", "0") == "1" if use_compile is None else use_compile
+        self.artifact_dir = ARTIFACT_DIR if artifact_dir is None else artifact_dir
+        self.intra_op_threads = intra_op_threads or _env_int("MMS_INTRA_OP_THREADS")
+        self.inter_op_threads = inter_op_threads or _env_int("MMS_INTER_OP_THREADS")
+        self.warmup = warmup
+        self.model = None
+        self.tokenizer = None
+        self.error = None
+        self._report = {"model_id": model_id, "quantized": self.quantize, "compiled": self.compile,
+                        "state": "idle"}
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start loading in the background; calling it again is a no-op"""
+        with self._lock:
+            if self._thread is None:
+                self._report["state"] = "loading"
+                self._thread = threading.Thread(target=self._load, name="mms-runtime", daemon=True)
+                self._thread.start()
+        return self
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the model is ready and return (model, tokenizer)"""
+        self.start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"MMS model {self.model_id} is still loading")
+        if self.error is not None:
+            raise self.error
+        return self.model, self.tokenizer
+
+    def _load(self):
+        try:
+            import torch
+            from transformers import AutoTokenizer, VitsModel
+
+            intra, inter = configure_threads(self.intra_op_threads, self.inter_op_threads)
+            start = time.perf_counter()
+            artifact = resolve_artifact(self.artifact_dir)
+            if artifact is not None:
+                # Offline: weights are mapped from the local safetensors file
+                model, tokenizer, manifest = load_artifact(artifact)
+                self._report.update({"source": "artifact", "artifact_version": manifest["version"],
+                                     "mmap": manifest["mmap"]})
+            else:
+                model = VitsModel.from_pretrained(self.model_id)
+                tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+                model.eval()
+                self._report["source"] = "hub"
+            if self.quantize:
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            if self.compile:
+                # Output lengths depend on predicted durations, so shapes stay dynamic
+                model = torch.compile(model, dynamic=True)
+            self._report.update({
+                "load_seconds": time.perf_counter() - start,
+                "intra_op_threads": intra,
+                "inter_op_threads": inter,
+                "rss_mb": rss_mb(),
+            })
+
+            if self.warmup:
+                self._report["first_rtf"] = measure_rtf(model, tokenizer)
+                steady = [measure_rtf(model, tokenizer) for _ in range(WARMUP_STEADY_RUNS)]
+                self._report["steady_rtf"] = sum(steady) / len(steady)
+
+            self.model, self.tokenizer = model, tokenizer
+            self._report["state"] = "ready"
+        except Exception as e:
+            self.error = e
+            self._report["state"] = "failed"
+            self._report["error"] = str(e)
+        finally:
+            self._ready.set()
+
+    def report(self):
+        """Return load time, thread settings and first/steady-state RTF"""
+        return dict(self._report)
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_mms_runtime():
+    """Return the process-wide runtime, starting the background load on first call"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = MMSRuntime().start()
+        return _runtime
@@ -0,0 +1,428 @@
+"""Shared MMS-TTS inference server for every Streamlit session and app replica.
+
+Within one Streamlit process every session already shares one model, but
+the sessions contend for it under the GIL and a single torch thread pool,
+and each app replica loads its own copy of the weights. This server loads
+the model once, moves its weights into shared memory and forks N worker
+processes from it, so the workers map the same weight pages instead of
+copying them (with an mms_artifact export, the pages of the mapped
+safetensors file). Each worker runs its own length-bucketed MMSBatcher on its
+own share of the cores, and throughput scales with the worker count.
+
+Apps connect over a local socket (multiprocessing.connection, authenticated
+with MMS_SERVER_AUTHKEY). The connection unpickles what it receives, so
+the key is required and has no default: whoever knows it can run code as
+the server. Requests wait in one shared queue; once
+MMS_SERVER_MAX_QUEUE requests are pending, new ones are rejected
+immediately with MMSServerBusy instead of queueing without bound, and a
+request whose deadline passed while it waited is dropped before the forward
+pass. Post-processing, encoding and caching stay in the app (tts_engine),
+so only raw float waveforms cross the socket.
+
+Start it with MMS_SERVER_AUTHKEY set to a random secret (e.g. from
+`python -c "import secrets; print(secrets.token_hex(32))"`) and
+`python mms_server.py --workers 4`, and give the app the same key plus
+MMS_SERVER_ADDRESS=127.0.0.1:6010; without that variable the app keeps
+loading the model in-process.
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from multiprocessing.connection import Client, Listener
+
+from hebrew_frontend import normalize_hebrew
+
+DEFAULT_ADDRESS = "127.0.0.1:6010"
+SERVER_ADDRESS = os.environ.get("MMS_SERVER_ADDRESS", "")
+AUTHKEY = os.environ.get("MMS_SERVER_AUTHKEY", "").encode()
+DEFAULT_MAX_QUEUE = int(os.environ.get("MMS_SERVER_MAX_QUEUE", "64"))
+REQUEST_TIMEOUT = float(os.environ.get("MMS_SERVER_TIMEOUT", "120"))
+CLIENT_CONCURRENCY = int(os.environ.get("MMS_SERVER_CLIENT_CONCURRENCY", "8"))
+LATENCY_WINDOW = 1024
+SUPERVISE_INTERVAL = 1.0
+# multiprocessing defaults to 1, which drops bursts of concurrent connects
+LISTEN_BACKLOG = 128
+
+
+class MMSServerError(Exception):
+    """Raised when the MMS inference server cannot serve a request"""
+
+
+class MMSServerBusy(MMSServerError):
+    """Raised when the server's request queue is full"""
+
+
+def require_authkey(authkey):
+    """Refuse to serve or connect without a shared secret"""
+    if not authkey:
+        raise MMSServerError("MMS_SERVER_AUTHKEY must be set to a random secret shared by the server and the apps")
+    return authkey
+
+
+def parse_address(address):
+    """'host:port' becomes a TCP address; anything else is a Unix socket path"""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and not address.startswith("/"):
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def _worker_main(model, tokenizer, tasks, results, threads, max_batch, warmup):
+    """Serve tasks from the shared queue with a local batcher until told to stop"""
+    from mms_batcher import MMSBatcher
+    from mms_runtime import configure_threads, measure_rtf
+
+    configure_threads(threads, 1)
+    if warmup:
+        measure_rtf(model, tokenizer)
+    batcher = MMSBatcher(model, tokenizer, max_batch=max_batch)
+    # A worker takes at most one batch worth of tasks, so the others get the rest
+    slots = threading.BoundedSemaphore(max_batch)
+
+    pid = os.getpid()
+
+    def finish(task_id, future):
+        slots.release()
+        try:
+            results.put(("done", pid, task_id, future.result(), None))
+        except Exception as e:
+            results.put(("done", pid, task_id, None, f"{type(e).__name__}: {e}"))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, text, deadline = task
+        # Tell the server which tasks this worker holds, so they fail fast if it dies
+        results.put(("claim", pid, task_id, None, None))
+        if time.time() > deadline:
+            # The caller has already given up on this request
+            results.put(("done", pid, task_id, None, "expired"))
+            continue
+        slots.acquire()
+        batcher.submit(text).add_done_callback(partial(finish, task_id))
+
+
+class MMSServer:
+    """Forks model workers and answers synthesis requests from app processes"""
+
+    def __init__(self, address=DEFAULT_ADDRESS, workers=None, threads=None, max_queue=DEFAULT_MAX_QUEUE,
+                 max_batch=None, authkey=AUTHKEY, warmup=True):
+        cpus = os.cpu_count() or 1
+        self.address = parse_address(address)
+        self.workers = workers or max(1, cpus // 2)
+        self.threads = threads or max(1, cpus // self.workers)
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.authkey = require_authkey(authkey)
+        self.warmup = warmup
+        # fork lets the workers inherit the loaded model instead of unpickling a copy
+        self._context = multiprocessing.get_context("fork")
+        self._tasks = self._context.Queue()
+        # SimpleQueue writes synchronously, so a claim is not lost in a feeder
+        # thread's buffer when its worker is killed
+        self._results = self._context.SimpleQueue()
+        self._processes = []
+        self._futures = {}
+        # Task ids each worker (by pid) has taken but not answered yet
+        self._claims = {}
+        self._dead = set()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._served = 0
+        self._rejected = 0
+        self._failed = 0
+        self._restarts = 0
+
+    def load(self):
+        """Load the model once and put its weights in shared memory"""
+        from hebrew_frontend import HebrewFrontend
+        from mms_batcher import DEFAULT_MAX_BATCH
+        from mms_runtime import MMSRuntime
+
+        # No inference in the parent: workers fork from a process that never
+        # started torch's OpenMP pool
+        runtime = MMSRuntime(warmup=False, intra_op_threads=1, inter_op_threads=1)
+        self.model, self.tokenizer = runtime.wait()
+        if not runtime.report().get("mmap"):
+            # Weights mapped from an artifact are shared through the page cache already
+            try:
+                self.model.share_memory()
+            except RuntimeError:
+                # Some quantized modules cannot move; they stay copy-on-write pages
+                pass
+        self.max_batch = self.max_batch or DEFAULT_MAX_BATCH
+        self.info = {
+            "model_id": self.model.config.name_or_path,
+            "sampling_rate": self.model.config.sampling_rate,
+            "allowed": "".join(sorted(HebrewFrontend(self.tokenizer).allowed)),
+            "workers": self.workers,
+            "threads_per_worker": self.threads,
+            "load_seconds": runtime.report()["load_seconds"],
+        }
+
+    def _spawn(self, index):
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self.model, self.tokenizer, self._tasks, self._results, self.threads, self.max_batch,
+                  self.warmup),
+            name=f"mms-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def start(self):
+        self.load()
+        self._processes = [self._spawn(i) for i in range(self.workers)]
+        threading.Thread(target=self._dispatch, name="mms-dispatch", daemon=True).start()
+        threading.Thread(target=self._supervise, name="mms-supervise", daemon=True).start()
+        return self
+
+    def _dispatch(self):
+        """Track which worker holds each task and hand its result to the connection waiting for it"""
+        while True:
+            kind, pid, task_id, waveform, error = self._results.get()
+            with self._lock:
+                if kind == "claim" and pid not in self._dead:
+                    self._claims.setdefault(pid, set()).add(task_id)
+                    continue
+                if kind == "claim":
+                    # Read after the supervisor found its worker dead
+                    error = "MMS worker died while synthesizing this request"
+                else:
+                    self._claims.get(pid, set()).discard(task_id)
+                future = self._futures.pop(task_id, None)
+            if future is None:
+                # The request timed out on the server side already
+                continue
+            if error is not None:
+                future.set_exception(MMSServerError(error))
+            else:
+                future.set_result(waveform)
+
+    def _supervise(self):
+        """Replace workers that died, e.g. after running out of memory, failing the tasks they held"""
+        while True:
+            time.sleep(SUPERVISE_INTERVAL)
+            for i, process in enumerate(self._processes):
+                if not process.is_alive():
+                    with self._lock:
+                        self._dead.add(process.pid)
+                        lost = [self._futures.pop(task_id, None) for task_id in self._claims.pop(process.pid, ())]
+                        self._restarts += 1
+                    for future in lost:
+                        if future is not None:
+                            future.set_exception(MMSServerError("MMS worker died while synthesizing this request"))
+                    self._processes[i] = self._spawn(i)
+
+    def submit(self, text, timeout=REQUEST_TIMEOUT):
+        """Queue text for a worker and return a Future, or raise MMSServerBusy when the queue is full"""
+        future = Future()
+        with self._lock:
+            if len(self._futures) >= self.max_queue:
+                self._rejected += 1
+                raise MMSServerBusy(f"MMS server queue is full ({self.max_queue} pending requests)")
+            task_id = next(self._ids)
+            self._futures[task_id] = future
+        future.task_id = task_id
+        self._tasks.put((task_id, text, time.time() + timeout))
+        return future
+
+    def synthesize(self, text, timeout=REQUEST_TIMEOUT):
+        start = time.perf_counter()
+        future = self.submit(text, timeout)
+        try:
+            waveform = future.result(timeout)
+        except Exception:
+            with self._lock:
+                self._futures.pop(future.task_id, None)
+                self._failed += 1
+            raise
+        with self._lock:
+            self._served += 1
+            self._latencies.append(time.perf_counter() - start)
+        return waveform
+
+    def stats(self):
+        """Return queue depth, admission counters, worker health and latency percentiles"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "workers": self.workers,
+                "alive": sum(p.is_alive() for p in self._processes),
+                "restarts": self._restarts,
+                "pending": len(self._futures),
+                "max_queue": self.max_queue,
+                "served": self._served,
+                "rejected": self._rejected,
+                "failed": self._failed,
+            }
+        stats["p50_ms"] = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+        stats["p95_ms"] = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+        return stats
+
+    def _handle(self, conn):
+        """Answer (op, payload) messages on one client connection until it closes"""
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if op == "synthesize":
+                        text, timeout = payload
+                        reply = ("ok", self.synthesize(text, timeout))
+                    elif op == "info":
+                        reply = ("ok", self.info)
+                    elif op == "stats":
+                        reply = ("ok", self.stats())
+                    else:
+                        reply = ("error", f"Unknown operation {op!r}")
+                except MMSServerBusy as e:
+                    reply = ("busy", str(e))
+                except TimeoutError:
+                    reply = ("error", "MMS server timed out waiting for a worker")
+                except Exception as e:
+                    reply = ("error", str(e) or type(e).__name__)
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+    def _listen(self):
+        if not isinstance(self.address, str):
+            return Listener(self.address, backlog=LISTEN_BACKLOG, authkey=self.authkey)
+        # A Unix socket is created owner-only (0600) from the start, with no window open to others
+        previous = os.umask(0o177)
+        try:
+            return Listener(self.address, backlog=LISTEN_BACKLOG, authkey=self.authkey)
+        finally:
+            os.umask(previous)
+
+    def serve_forever(self):
+        with self._listen() as listener:
+            print(f"MMS server on {listener.address}: {self.workers} workers x {self.threads} threads, "
+                  f"queue limit {self.max_queue}", flush=True)
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, multiprocessing.AuthenticationError):
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), name="mms-conn", daemon=True).start()
+
+
+class MMSClient:
+    """Connection pool to an MMS server, with the batcher's submit/synthesize interface"""
+
+    def __init__(self, address, authkey=AUTHKEY, timeout=REQUEST_TIMEOUT, concurrency=CLIENT_CONCURRENCY):
+        self.address = parse_address(address)
+        self.authkey = require_authkey(authkey)
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._info = None
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="mms-client")
+
+    def _call(self, op, payload=None, timeout=None):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        try:
+            if conn is None:
+                conn = Client(self.address, authkey=self.authkey)
+            conn.send((op, payload))
+            if not conn.poll(timeout or self.timeout):
+                conn.close()
+                raise MMSServerError(f"MMS server did not answer within {timeout or self.timeout:.0f}s")
+            status, result = conn.recv()
+        except (EOFError, OSError, multiprocessing.AuthenticationError) as e:
+            if conn is not None:
+                conn.close()
+            raise MMSServerError(f"Cannot reach the MMS server at {self.address}: {e}") from e
+        with self._lock:
+            self._idle.append(conn)
+        if status == "busy":
+            raise MMSServerBusy(result)
+        if status != "ok":
+            raise MMSServerError(result)
+        return result
+
+    def info(self):
+        """Model id, sampling rate, tokenizer alphabet and worker layout, fetched once"""
+        if self._info is None:
+            self._info = self._call("info")
+        return self._info
+
+    @property
+    def sampling_rate(self):
+        return self.info()["sampling_rate"]
+
+    @property
+    def model_id(self):
+        return self.info()["model_id"]
+
+    def normalize(self, text):
+        """Normalize text exactly as the server's front-end will"""
+        return normalize_hebrew(text, frozenset(self.info()["allowed"]))
+
+    def synthesize(self, text, timeout=None):
+        """Synthesize text on the server and return its float waveform"""
+        timeout = timeout or self.timeout
+        # A little slack, so the server's own timeout answers first
+        return self._call("synthesize", (text, timeout), timeout=timeout + 5)
+
+    def submit(self, text):
+        """Synthesize on a client thread and return a Future of the waveform"""
+        return self._pool.submit(self.synthesize, text)
+
+    def stats(self):
+        return self._call("stats")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_mms_client():
+    """Return the shared client when MMS_SERVER_ADDRESS is set, else None"""
+    global _client
+    if not SERVER_ADDRESS:
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = MMSClient(SERVER_ADDRESS)
+        return _client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared MMS-TTS inference server")
+    parser.add_argument("--address", default=SERVER_ADDRESS or DEFAULT_ADDRESS,
+                        help="host:port to listen on, or a Unix socket path")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("MMS_SERVER_WORKERS", "0")) or None,
+                        help="Model worker processes (default: half the cores)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch threads per worker (default: cores / workers)")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="Pending requests before new ones are rejected")
+    parser.add_argument("--max-batch", type=int, default=None, help="Batch size per worker")
+    parser.add_argument("--no-warmup", action="store_true", help="Skip each worker's warm-up inference")
+    args = parser.parse_args(argv)
+
+    try:
+        server = MMSServer(args.address, workers=args.workers, threads=args.threads, max_queue=args.max_queue,
+                           max_batch=args.max_batch, warmup=not args.no_warmup)
+    except MMSServerError as e:
+        parser.error(str(e))
+    server.start().serve_forever()
+
+
+if __name__ == "__main__":
+    main()
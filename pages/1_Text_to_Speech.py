@@ -1,25 +1,29 @@
 import streamlit as st
 import openai
-import os
-import base64
-from tempfile import NamedTemporaryFile
 import time
 
-# Import your existing functions from app.py
-from app import (
-    get_binary_file_downloader_html,
-    openai_tts,
-    openai_chat_tts,
-    load_mms_model,
-    mms_tts
+from audio_download import (
+    forget_audio,
+    remember_audio,
+    render_remembered_audio,
 )
 
+from mms_runtime import get_mms_runtime
+from mms_server import get_mms_client
+
+from tracing import start_metrics_server
+from tts_registry import PRESET_PROMPTS, VOICE_OPTIONS, synthesize_sync
+from tts_engine import TTSError, mms_synthesizer
+
 st.set_page_config(
     page_title="Text to Speech",
     page_icon="🔊",
     layout="wide"
 )
 
+# Span timings for every page are served on the local metrics endpoint
+start_metrics_server()
+
 # Set OpenAI API key
 if 'OPENAI_API_KEY' not in st.secrets:
     st.error("OpenAI API key not found in secrets!")
@@ -27,41 +31,40 @@ if 'OPENAI_API_KEY' not in st.secrets:
 else:
     openai.api_key = st.secrets['OPENAI_API_KEY']
 
+# Start loading the MMS model in the background, unless a shared MMS server does the inference
+if get_mms_client() is None:
+    get_mms_runtime()
+
 st.title("Text to Speech Comparison")
 
+with st.sidebar:
+    use_cache = st.checkbox("Reuse cached audio", value=True,
+                            help="Serve identical requests from the local audio cache")
+
 # Create tabs for different functionalities
 tab1, tab2, tab3 = st.tabs(["Basic TTS", "Chat TTS", "MMS-TTS"])
 
 with tab1:
     st.header("Basic TTS")
-    voice_options = {
-        "Nova (Female)": "nova",
-        "Alloy (Neutral)": "alloy",
-        "Echo (Male)": "echo",
-        "Fable (Male)": "fable",
-        "Onyx (Male)": "onyx",
-        "Shimmer (Female)": "shimmer"
-    }
+    voice_options = VOICE_OPTIONS
     selected_voice = st.selectbox("Select voice:", list(voice_options.keys()), key="basic_voice")
     text_input = st.text_area("Enter text:", value="שלום עולם", height=150, key="basic_text")
     
     if st.button("Generate Basic TTS"):
         if text_input.strip():
+            forget_audio("basic_tts_output")
             with st.spinner("Generating audio..."):
-                audio_file = openai_tts(text_input, voice=voice_options[selected_voice])
-                if audio_file:
-                    st.audio(audio_file, format='audio/mp3')
-                    st.markdown(get_binary_file_downloader_html(audio_file, "tts_output.mp3"), unsafe_allow_html=True)
-                    os.unlink(audio_file)
+                try:
+                    audio = synthesize_sync("openai_tts", text_input, voice=voice_options[selected_voice],
+                                            use_cache=use_cache)
+                    remember_audio("basic_tts_output", "Basic TTS", audio, "tts_output.mp3")
+                except TTSError as e:
+                    st.error(str(e))
+    render_remembered_audio("basic_tts_output", headings=False)
 
 with tab2:
     st.header("Chat TTS")
-    preset_prompts = {
-        "British Teacher": "You are a helpful assistant that speaks in a British accent and enunciates like you're talking to a child.",
-        "Fast Speaker": "You are a helpful assistant that speaks in a British accent and speaks really fast.",
-        "Hebrew Speaker": "You are a helpful female cheerful assistant that speaks in a correct Hebrew accent and enunciates like you're talking to a child.",
-        "Custom": "Custom prompt..."
-    }
+    preset_prompts = PRESET_PROMPTS
     selected_prompt = st.selectbox("Select speaking style:", list(preset_prompts.keys()), key="chat_prompt")
     
     if selected_prompt == "Custom":
@@ -73,12 +76,15 @@ with tab2:
     
     if st.button("Generate Chat TTS"):
         if text_input.strip():
+            forget_audio("chat_tts_output")
             with st.spinner("Generating audio..."):
-                audio_file = openai_chat_tts(text_input, system_prompt)
-                if audio_file:
-                    st.audio(audio_file, format='audio/mp3')
-                    st.markdown(get_binary_file_downloader_html(audio_file, "chat_tts_output.mp3"), unsafe_allow_html=True)
-                    os.unlink(audio_file)
+                try:
+                    audio = synthesize_sync("openai_chat_tts", text_input, system_prompt=system_prompt,
+                                            use_cache=use_cache)
+                    remember_audio("chat_tts_output", "Chat TTS", audio, "chat_tts_output.mp3")
+                except TTSError as e:
+                    st.error(str(e))
+    render_remembered_audio("chat_tts_output", headings=False)
 
 with tab3:
     st.header("MMS-TTS (Hebrew Specialized)")
@@ -86,13 +92,14 @@ with tab3:
     
     if st.button("Generate MMS TTS"):
         if text_input.strip():
-            with st.spinner("Loading MMS model..."):
-                mms_model, mms_tokenizer = load_mms_model()
-                
-            if mms_model is not None and mms_tokenizer is not None:
+            forget_audio("mms_tts_output")
+            try:
+                # The model normally finished loading in the background at startup
+                with st.spinner("Waiting for the MMS model to finish loading..."):
+                    mms_synthesizer()
                 with st.spinner("Generating audio..."):
-                    audio_file = mms_tts(text_input, mms_model, mms_tokenizer)
-                    if audio_file:
-                        st.audio(audio_file, format='audio/wav')
-                        st.markdown(get_binary_file_downloader_html(audio_file, "mms_tts_output.wav"), unsafe_allow_html=True)
-                        os.unlink(audio_file) 
+                    audio = synthesize_sync("mms", text_input, use_cache=use_cache)
+                remember_audio("mms_tts_output", "MMS-TTS", audio, "mms_tts_output" + audio.extension)
+            except TTSError as e:
+                st.error(str(e))
+    render_remembered_audio("mms_tts_output", headings=False)
@@ -1,43 +1,112 @@
 import streamlit as st
 import openai
-import os
-import base64
-from tempfile import NamedTemporaryFile
 import time
-
-def get_binary_file_downloader_html(bin_file, file_label='File'):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    b64 = base64.b64encode(data).decode()
-    return f'<a href="data:application/octet-stream;base64,{b64}" download="{file_label}">Download {file_label}</a>'
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from audio_download import forget_audio, remember_audio, render_audio
+from audio_result import AudioResult
+from conversation_memory import ConversationMemory
+from http_client import get_http_client, get_openai_client
+from text_segmenter import iter_sentences
+from tts_engine import OPENAI_SAMPLE_RATE, TTSError
+from tracing import get_tracer, span, start_metrics_server
+from tts_registry import PRESET_PROMPTS, VOICE_OPTIONS, synthesize_sync
 
 def openai_tts(text, voice="nova"):
-    """Convert text to speech using OpenAI's basic TTS API"""
+    """Convert text to speech with the shared OpenAI TTS backend"""
     try:
-        response = openai.audio.speech.create(
-            model="tts-1",
-            voice=voice,
-            input=text
-        )
-        
-        with NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-            response.stream_to_file(fp.name)
-            return fp.name
-    except Exception as e:
-        st.error(f"Error generating speech with OpenAI TTS: {str(e)}")
+        return synthesize_sync("openai_tts", text, voice=voice)
+    except TTSError as e:
+        st.error(str(e))
         return None
 
-def chat_with_gpt(messages):
-    """Chat with GPT and get text response"""
-    try:
-        response = openai.chat.completions.create(
+def stream_chat_with_gpt(messages):
+    """Chat with GPT and yield the text response as it streams in"""
+    start = time.perf_counter()
+    first_token = True
+    with get_http_client().slot("openai"), span("openai.chat.stream"):
+        stream = get_openai_client().chat.completions.create(
             model="gpt-4",
-            messages=messages
+            messages=messages,
+            stream=True
         )
-        return response.choices[0].message.content
-    except Exception as e:
-        st.error(f"Error in chat completion: {str(e)}")
-        return None
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token:
+                    get_tracer().observe("openai.chat.first_token", time.perf_counter() - start)
+                    first_token = False
+                yield chunk.choices[0].delta.content
+
+def summarize_turns(previous_summary, turns, max_tokens):
+    """Fold turns that left the context window into the running summary"""
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    with get_http_client().slot("openai"), span("openai.chat.summarize"):
+        response = get_openai_client().chat.completions.create(
+            model="gpt-4o-mini",
+            max_tokens=max_tokens,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Update the running summary of a conversation. Keep names, facts, "
+                               "decisions and open questions. Write in the language of the conversation.",
+                },
+                {
+                    "role": "user",
+                    "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}",
+                },
+            ],
+        )
+    return response.choices[0].message.content.strip()
+
+def speak_streaming_reply(messages, voice, text_placeholder, audio_col):
+    """Show the reply as it streams and speak it sentence by sentence
+
+    Each complete sentence is sent to TTS on a worker thread while the rest
+    of the reply is still streaming, and sentence audio is shown in order as
+    soon as it is ready. Returns the full reply, its audio and the time to
+    first audio.
+    """
+    start = time.perf_counter()
+    reply = ""
+    parts = []
+    futures = []
+    first_audio = None
+
+    def tokens():
+        nonlocal reply
+        for token in stream_chat_with_gpt(messages):
+            reply += token
+            text_placeholder.write(f"Assistant: {reply}▌")
+            yield token
+
+    def show_ready(block):
+        nonlocal first_audio
+        while len(parts) < len(futures) and (block or futures[len(parts)].done()):
+            audio = futures[len(parts)].result()
+            parts.append(audio)
+            if audio is None:
+                continue
+            if first_audio is None:
+                first_audio = time.perf_counter() - start
+            with audio_col:
+                st.audio(audio.tobytes(), format=audio.mime, autoplay=(len(parts) == 1))
+
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=4, initializer=add_script_run_ctx, initargs=(None, ctx)) as pool:
+        try:
+            for sentence in iter_sentences(tokens()):
+                futures.append(pool.submit(openai_tts, sentence, voice))
+                show_ready(block=False)
+        except Exception as e:
+            st.error(f"Error in chat completion: {str(e)}")
+        show_ready(block=True)
+
+    text_placeholder.write(f"Assistant: {reply}")
+    spoken = [audio for audio in parts if audio is not None]
+    # MP3 frames concatenate cleanly, so the sentence clips form one file
+    full_audio = AudioResult(b"".join(a.tobytes() for a in spoken), OPENAI_SAMPLE_RATE, "mp3") if spoken else None
+    return reply, full_audio, first_audio
 
 # Set page configuration
 st.set_page_config(
@@ -46,6 +115,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Span timings for every page are served on the local metrics endpoint
+start_metrics_server()
+
 # Set OpenAI API key
 if 'OPENAI_API_KEY' not in st.secrets:
     st.error("OpenAI API key not found in secrets!")
@@ -54,8 +126,10 @@ else:
     openai.api_key = st.secrets['OPENAI_API_KEY']
 
 # Initialize session state for chat history
-if 'messages' not in st.session_state:
-    st.session_state.messages = []
+if 'memory' not in st.session_state:
+    st.session_state.memory = ConversationMemory()
+memory = st.session_state.memory
+memory.summarize = summarize_turns
 
 # Main app
 st.title("Voice Chat Assistant")
@@ -64,23 +138,11 @@ st.title("Voice Chat Assistant")
 col1, col2 = st.columns(2)
 
 with col1:
-    voice_options = {
-        "Nova (Female)": "nova",
-        "Alloy (Neutral)": "alloy",
-        "Echo (Male)": "echo",
-        "Fable (Male)": "fable",
-        "Onyx (Male)": "onyx",
-        "Shimmer (Female)": "shimmer"
-    }
+    voice_options = VOICE_OPTIONS
     selected_voice = st.selectbox("Select voice:", list(voice_options.keys()))
 
 with col2:
-    preset_prompts = {
-        "British Teacher": "You are a helpful assistant that speaks in a British accent and enunciates like you're talking to a child.",
-        "Fast Speaker": "You are a helpful assistant that speaks in a British accent and speaks really fast.",
-        "Hebrew Speaker": "You are a helpful female cheerful assistant that speaks in a correct Hebrew accent and enunciates like you're talking to a child.",
-        "Custom": "Custom prompt..."
-    }
+    preset_prompts = PRESET_PROMPTS
     selected_prompt = st.selectbox("Select speaking style:", list(preset_prompts.keys()))
 
 if selected_prompt == "Custom":
@@ -91,57 +153,82 @@ else:
     system_prompt = preset_prompts[selected_prompt]
 
 # Initialize or update system message
-if not st.session_state.messages:
-    st.session_state.messages = [{"role": "system", "content": system_prompt}]
-else:
-    st.session_state.messages[0] = {"role": "system", "content": system_prompt}
+memory.set_system_prompt(system_prompt)
+
+# Only recent turns are sent in full; older ones are rolled into a summary
+with st.sidebar:
+    st.subheader("Conversation Memory")
+    memory.set_token_budget(st.slider(
+        "Context token budget", min_value=500, max_value=8000,
+        value=memory.token_budget, step=250,
+        help="Upper bound on the tokens sent to the model with each message"
+    ))
 
 # Chat interface
 st.subheader("Chat")
 user_input = st.text_area("Your message:", height=100)
 
-if st.button("Send and Speak"):
-    if user_input.strip():
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": user_input})
+if st.button("Send and Speak") and user_input.strip():
+    # Add user message to chat history
+    memory.add("user", user_input)
+    forget_audio("last_response")
+    
+    # Create columns for response display
+    text_col, audio_col = st.columns([3, 1])
+    
+    # Stream the GPT response and speak it sentence by sentence
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    response, audio, first_audio = speak_streaming_reply(
+        memory.messages(),
+        voice_options[selected_voice],
+        text_col.empty(),
+        audio_col,
+    )
+    
+    if response:
+        # Add assistant response to chat history
+        memory.add("assistant", response)
         
-        # Get GPT response
-        response = chat_with_gpt(st.session_state.messages)
+        if audio is not None:
+            caption = f"First audio after {first_audio:.2f}s"
+            download_filename = f"response_{timestamp}.mp3"
+            with audio_col:
+                st.caption(caption)
+                st.download_button(f"Download {download_filename}", data=audio.tobytes(),
+                                   file_name=download_filename, mime=audio.mime)
+            remember_audio("last_response", response, audio, download_filename, caption=caption)
+else:
+    # Show the latest spoken response again after the rerun a download click triggers
+    for response, output in st.session_state.get("last_response", {}).items():
+        text_col, audio_col = st.columns([3, 1])
+        
+        with text_col:
+            st.write("Assistant:", response)
         
-        if response:
-            # Add assistant response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": response})
-            
-            # Generate speech for the response
-            timestamp = time.strftime("%Y%m%d-%H%M%S")
-            audio_file = openai_tts(response, voice=voice_options[selected_voice])
-            
-            if audio_file:
-                # Create columns for response display
-                text_col, audio_col = st.columns([3, 1])
-                
-                with text_col:
-                    st.write("Assistant:", response)
-                
-                with audio_col:
-                    st.audio(audio_file, format='audio/mp3')
-                    download_filename = f"response_{timestamp}.mp3"
-                    st.markdown(get_binary_file_downloader_html(audio_file, download_filename), unsafe_allow_html=True)
-                
-                # Cleanup
-                os.unlink(audio_file)
+        with audio_col:
+            st.caption(output["caption"])
+            render_audio(output["data"], output["file_name"], output["mime"])
 
 # Display chat history in a scrollable container
 st.subheader("Chat History")
 chat_container = st.container()
 with chat_container:
-    for message in st.session_state.messages[1:]:  # Skip the system message
+    for message in memory.history():
         role = "You" if message["role"] == "user" else "Assistant"
         st.write(f"{role}: {message['content']}")
 
+with st.sidebar:
+    memory_stats = memory.stats()
+    st.caption(
+        f"Next request: ~{memory_stats['request_tokens']} tokens · "
+        f"{memory_stats['window_turns']} recent turns in full · "
+        f"{memory_stats['summarized_turns']} summarized"
+    )
+
 # Clear chat history button
 if st.button("Clear Chat History"):
-    st.session_state.messages = [{"role": "system", "content": system_prompt}]
+    memory.clear()
+    forget_audio("last_response")
     st.experimental_rerun()
 
 # Instructions in an expander
@@ -150,7 +237,7 @@ with st.expander("Instructions and Notes"):
     ### Instructions:
     1. Select a voice and speaking style for the assistant
     2. Type your message (Hebrew or English)
-    3. Click 'Send and Speak' to get both text and voice response
+    3. Click 'Send and Speak' to get both text and voice response; the reply is shown and spoken as it streams in
     4. Listen to the response or download it
     5. View the chat history below
     6. Clear chat history if needed
@@ -159,5 +246,6 @@ with st.expander("Instructions and Notes"):
     - The assistant will respond based on the selected speaking style
     - You can download any response as an MP3 file
     - The chat history is preserved during your session
+    - Long conversations keep the latest messages in full and a short summary of older ones, within the token budget set in the sidebar
     - Different speaking styles will affect how the assistant responds
     """) 
\ No newline at end of file
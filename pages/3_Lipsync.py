@@ -1,13 +1,17 @@
 import streamlit as st
 import os
-import requests
-import json
-from tempfile import NamedTemporaryFile
 
-def process_lipsync(video_file, text_prompt, voice_name="nova"):
-    """Process video with Gooey.ai Lipsync"""
+from lipsync_cache import get_lipsync_cache, lipsync_cache_key
+from lipsync_jobs import get_job_manager
+from lipsync_ui import current_job_id, show_job, track_job
+from tracing import start_metrics_server
+from tts_registry import VOICE_OPTIONS
+
+def process_lipsync(video_file, text_prompt, voice_name="nova", use_cache=True):
+    """Submit a Gooey.ai Lipsync job, or reuse an identical earlier one, and return its local job id"""
     try:
-        files = [("input_face", video_file)]
+        face_bytes = video_file.getvalue()
+        files = [("input_face", (video_file.name, face_bytes, video_file.type))]
         payload = {
             "functions": None,
             "variables": None,
@@ -39,15 +43,16 @@ def process_lipsync(video_file, text_prompt, voice_name="nova"):
             "selected_model": "Wav2Lip",
         }
 
-        response = requests.post(
-            "https://api.gooey.ai/v2/LipsyncTTS/form/",
-            headers={
-                "Authorization": "bearer " + st.secrets["GOOEY_API_KEY"],
-            },
-            files=files,
-            data={"json": json.dumps(payload)},
-        )
-        return response
+        manager = get_job_manager(st.secrets["GOOEY_API_KEY"])
+        cache = get_lipsync_cache()
+        key = lipsync_cache_key(face_bytes, payload)
+        job_id = cache.lookup(key, manager) if use_cache else None
+        if job_id:
+            st.info("The same video, text and voice were rendered before; reusing that render.")
+            return job_id
+        job_id = manager.submit(payload, files=files)
+        cache.remember(key, face_bytes, job_id)
+        return job_id
     except Exception as e:
         st.error(f"Error in lipsync processing: {str(e)}")
         return None
@@ -59,6 +64,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Span timings for every page are served on the local metrics endpoint
+start_metrics_server()
+
 # Main app
 st.title("Lipsync Generator")
 st.write("Generate lip-synced videos with custom text and voice")
@@ -80,14 +88,7 @@ with col1:
 
 with col2:
     # Voice selection
-    voice_options = {
-        "Nova (Female)": "nova",
-        "Alloy (Neutral)": "alloy",
-        "Echo (Male)": "echo",
-        "Fable (Male)": "fable",
-        "Onyx (Male)": "onyx",
-        "Shimmer (Female)": "shimmer"
-    }
+    voice_options = VOICE_OPTIONS
     selected_voice = st.selectbox("Select voice for the speech", list(voice_options.keys()))
     
     # Text input
@@ -97,6 +98,9 @@ with col2:
         help="Enter the text that will be spoken in the video"
     )
 
+    use_cache = st.checkbox("Reuse earlier renders", value=True,
+                            help="Serve a render of the same video, text and voice from the lipsync cache")
+
 # Process button
 if st.button("Generate Lipsync"):
     if video_file is None:
@@ -104,32 +108,34 @@ if st.button("Generate Lipsync"):
     elif not text_prompt.strip():
         st.warning("Please enter some text to be spoken.")
     else:
-        with st.spinner("Processing... This may take a few minutes."):
-            response = process_lipsync(
+        with st.spinner("Submitting job..."):
+            job_id = process_lipsync(
                 video_file, 
                 text_prompt, 
-                voice_options[selected_voice]
+                voice_options[selected_voice],
+                use_cache=use_cache
             )
-            
-            if response and response.ok:
-                result = response.json()
-                st.success("Processing complete!")
-                
-                # Display result details
-                with st.expander("View Processing Details"):
-                    st.json(result)
-                
-                # If the response includes a video URL, display it
-                if "output_url" in result:
-                    st.subheader("Generated Video")
-                    st.video(result["output_url"])
-                    
-                    # Add download button for the video
-                    st.markdown(f"[Download Generated Video]({result['output_url']})")
-            else:
-                st.error("Failed to process the video. Please try again.")
-                if response:
-                    st.error(f"Error: {response.content}")
+        if job_id:
+            track_job(job_id)
+
+def show_result(job):
+    """Display a finished lipsync job"""
+    # Display result details
+    with st.expander("View Processing Details"):
+        st.json(job["result"])
+    
+    # If the response includes a video URL, display it
+    if job["output_url"]:
+        st.subheader("Generated Video")
+        st.video(job["output_url"])
+        
+        # Add download button for the video
+        st.markdown(f"[Download Generated Video]({job['output_url']})")
+
+# Follow the current job; reruns and page reloads reconnect to it
+job_id = current_job_id()
+if job_id:
+    show_job(get_job_manager(st.secrets["GOOEY_API_KEY"]), job_id, show_result)
 
 # Instructions
 with st.expander("Instructions and Tips"):
@@ -138,7 +144,7 @@ with st.expander("Instructions and Tips"):
     1. Upload a video file containing a clear face view
     2. Select the desired voice for the speech
     3. Enter the text you want the person to speak
-    4. Click 'Generate Lipsync' and wait for processing
+    4. Click 'Generate Lipsync' and wait for processing (you can rerun or reload the page; the job keeps running)
     5. Download or preview the generated video
 
     ### Tips:
@@ -146,6 +152,7 @@ with st.expander("Instructions and Tips"):
     - Keep the face relatively still and centered
     - Ensure the text length matches the video duration
     - For best results, use high-quality video input
+    - Rendering the same video with the same text and voice again is served instantly from the cache
     
     ### Supported Formats:
     - Video: MP4, MOV
@@ -1,12 +1,16 @@
 import streamlit as st
 import os
-import requests
-import json
 import base64
 from io import BytesIO
 
-def process_file_lipsync(image_file, text_prompt, voice_name="nova"):
-    """Process video with Gooey.ai Lipsync using uploaded file"""
+from lipsync_cache import get_lipsync_cache, lipsync_cache_key
+from lipsync_jobs import get_job_manager
+from lipsync_ui import current_job_id, show_job, track_job
+from tracing import start_metrics_server
+from tts_registry import VOICE_OPTIONS
+
+def process_file_lipsync(image_file, text_prompt, voice_name="nova", use_cache=True):
+    """Submit a Gooey.ai Lipsync job for an uploaded image, or reuse an identical earlier one, and return its local job id"""
     try:
         # Convert the uploaded file to base64
         bytes_data = image_file.getvalue()
@@ -44,27 +48,37 @@ def process_file_lipsync(image_file, text_prompt, voice_name="nova"):
             "selected_model": "Wav2Lip",
         }
 
-        response = requests.post(
-            "https://api.gooey.ai/v2/LipsyncTTS",
-            headers={
-                "Authorization": "bearer " + st.secrets["GOOEY_API_KEY"],
-            },
-            json=payload,
-        )
-        return response
+        manager = get_job_manager(st.secrets["GOOEY_API_KEY"])
+        cache = get_lipsync_cache()
+        key = lipsync_cache_key(bytes_data, payload)
+        job_id = cache.lookup(key, manager) if use_cache else None
+        if job_id:
+            st.info("The same image, text and voice were rendered before; reusing that render.")
+            return job_id
+        job_id = manager.submit(payload)
+        cache.remember(key, bytes_data, job_id)
+        return job_id
     except Exception as e:
         st.error(f"Error in lipsync processing: {str(e)}")
         return None
 
-def download_video(url):
-    """Download video from URL and return as bytes"""
+def download_video(url, job_id):
+    """Download job_id's video from URL once into the lipsync cache and return it as bytes"""
+    # Sessions keep only the cached file's path, not the video bytes; reruns
+    # (a download click is one) read the local file again
+    cached = st.session_state.get("lipsync_video")
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.content
+        if cached and cached["url"] == url and os.path.exists(cached["path"]):
+            path = cached["path"]
+        else:
+            path = get_lipsync_cache().local_video(url, job_id)
+        with open(path, "rb") as f:
+            data = f.read()
     except Exception as e:
         st.error(f"Error downloading video: {str(e)}")
         return None
+    st.session_state.lipsync_video = {"url": url, "path": path}
+    return data
 
 # Set page configuration
 st.set_page_config(
@@ -73,6 +87,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Span timings for every page are served on the local metrics endpoint
+start_metrics_server()
+
 # Main app
 st.title("File Upload Lipsync Generator")
 st.write("Generate lip-synced videos from uploaded images")
@@ -94,14 +111,7 @@ with col1:
 
 with col2:
     # Voice selection
-    voice_options = {
-        "Nova (Female)": "nova",
-        "Alloy (Neutral)": "alloy",
-        "Echo (Male)": "echo",
-        "Fable (Male)": "fable",
-        "Onyx (Male)": "onyx",
-        "Shimmer (Female)": "shimmer"
-    }
+    voice_options = VOICE_OPTIONS
     selected_voice = st.selectbox("Select voice for the speech", list(voice_options.keys()))
     
     # Text input
@@ -112,6 +122,9 @@ with col2:
         help="Enter the text that will be spoken in the video"
     )
 
+    use_cache = st.checkbox("Reuse earlier renders", value=True,
+                            help="Serve a render of the same image, text and voice from the lipsync cache")
+
 # Process button
 if st.button("Generate Lipsync"):
     if not uploaded_file:
@@ -119,39 +132,43 @@ if st.button("Generate Lipsync"):
     elif not text_prompt.strip():
         st.warning("Please enter some text to be spoken.")
     else:
-        with st.spinner("Processing... This may take a few minutes."):
-            response = process_file_lipsync(
+        with st.spinner("Submitting job..."):
+            job_id = process_file_lipsync(
                 uploaded_file,
                 text_prompt, 
-                voice_options[selected_voice]
+                voice_options[selected_voice],
+                use_cache=use_cache
+            )
+        if job_id:
+            track_job(job_id)
+
+def show_result(job):
+    """Display a finished lipsync job and enable download"""
+    # Display result details
+    with st.expander("View Processing Details"):
+        st.json(job["result"])
+    
+    # If the response includes a video URL, display it and enable download
+    if job["output_url"]:
+        st.subheader("Generated Video")
+        
+        # Fetch the video once into the lipsync cache; the preview and the
+        # download button get the same bytes, which Streamlit keeps as one
+        # media entry per widget
+        video_data = download_video(job["output_url"], job["id"])
+        if video_data:
+            st.video(video_data, format="video/mp4")
+            st.download_button(
+                label="Download Generated Video",
+                data=video_data,
+                file_name="generated_video.mp4",
+                mime="video/mp4"
             )
-            
-            if response and response.ok:
-                result = response.json()
-                st.success("Processing complete!")
-                
-                # Display result details
-                with st.expander("View Processing Details"):
-                    st.json(result)
-                
-                # If the response includes a video URL, display it and enable download
-                if "output_url" in result:
-                    st.subheader("Generated Video")
-                    st.video(result["output_url"])
-                    
-                    # Download the video and create a download button
-                    video_data = download_video(result["output_url"])
-                    if video_data:
-                        st.download_button(
-                            label="Download Generated Video",
-                            data=video_data,
-                            file_name="generated_video.mp4",
-                            mime="video/mp4"
-                        )
-            else:
-                st.error("Failed to process the video. Please try again.")
-                if response:
-                    st.error(f"Error: {response.content}")
+
+# Follow the current job; reruns and page reloads reconnect to it
+job_id = current_job_id()
+if job_id:
+    show_job(get_job_manager(st.secrets["GOOEY_API_KEY"]), job_id, show_result)
 
 # Instructions
 with st.expander("Instructions and Tips"):
@@ -160,13 +177,14 @@ with st.expander("Instructions and Tips"):
     1. Upload an image containing a clear face view
     2. Select the desired voice for the speech
     3. Enter the text you want the person to speak
-    4. Click 'Generate Lipsync' and wait for processing
+    4. Click 'Generate Lipsync' and wait for processing (you can rerun or reload the page; the job keeps running)
     5. Download or preview the generated video
 
     ### Tips:
     - Use images with good lighting and clear face visibility
     - The face should be relatively front-facing
     - For best results, use high-quality images
+    - Rendering the same image with the same text and voice again is served instantly from the cache
     
     ### Supported Formats:
     - Supported image formats: JPG, PNG
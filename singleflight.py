@@ -0,0 +1,69 @@
+"""Coalescing of identical in-flight synthesis requests.
+
+Every Streamlit session runs in the same process, so when several sessions
+ask for the same audio at the same time only the first caller (the leader)
+runs the synthesis; the others (followers) wait for the leader's result or
+exception instead of issuing duplicate API calls or forward passes. A key is
+forgotten as soon as its call finishes, so later requests are served by the
+audio cache rather than by this layer.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn):
+        """Return fn(), or the result of an identical call already in flight"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            calls = self.leaders + self.followers
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.followers,
+                "coalesce_rate": self.followers / calls if calls else 0.0,
+            }
+
+
+_singleflight = None
+_singleflight_lock = threading.Lock()
+
+
+def get_singleflight():
+    """Return the process-wide single-flight group shared by all sessions"""
+    global _singleflight
+    with _singleflight_lock:
+        if _singleflight is None:
+            _singleflight = SingleFlight()
+        return _singleflight
@@ -0,0 +1,95 @@
+"""Sentence-level streaming synthesis for long Hebrew and English texts.
+
+Text is cut at sentence boundaries (and at clause boundaries when a sentence
+is still too long), each chunk is synthesized separately and yielded as soon
+as it is ready, and the chunks are stitched back together with short
+crossfades. The first chunk is kept short and synthesized on its own, so the
+time to first audio does not depend on the length of the input.
+"""
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.io.wavfile as wav
+
+from http_client import get_http_client, get_openai_client
+from text_segmenter import split_sentences
+from tracing import span
+from tts_engine import mms_synthesizer
+
+OPENAI_PCM_SAMPLE_RATE = 24000
+DEFAULT_FADE_MS = 25
+
+def crossfade_concat(chunks, sample_rate, fade_ms=DEFAULT_FADE_MS):
+    """Join float waveforms, overlapping neighbours with an equal-power crossfade"""
+    chunks = [np.asarray(c, dtype=np.float32) for c in chunks if len(c)]
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+
+    fade = int(sample_rate * fade_ms / 1000)
+    total = sum(len(c) for c in chunks)
+    overlaps = [min(fade, len(a), len(b)) for a, b in zip(chunks, chunks[1:])]
+    out = np.zeros(total - sum(overlaps), dtype=np.float32)
+
+    out[:len(chunks[0])] = chunks[0]
+    pos = len(chunks[0])
+    for chunk, overlap in zip(chunks[1:], overlaps):
+        start = pos - overlap
+        if overlap:
+            t = np.linspace(0.0, np.pi / 2, overlap, dtype=np.float32)
+            out[start:pos] = out[start:pos] * np.cos(t) + chunk[:overlap] * np.sin(t)
+        out[pos:pos + len(chunk) - overlap] = chunk[overlap:]
+        pos += len(chunk) - overlap
+    return out
+
+
+def to_wav_bytes(samples, sample_rate):
+    """Encode a float waveform, or int16 samples as they are, as 16-bit WAV bytes"""
+    if samples.dtype != np.int16:
+        samples = np.int16(np.clip(samples, -1.0, 1.0) * 32767)
+    buffer = io.BytesIO()
+    wav.write(buffer, sample_rate, samples)
+    return buffer.getvalue()
+
+
+def stream_mms(text, model=None, tokenizer=None, **split_kwargs):
+    """Yield MMS float waveforms chunk by chunk, in order
+
+    Without a model, the chunks go to the MMS server if one is configured.
+    """
+    chunks = split_sentences(text, **split_kwargs)
+    if not chunks:
+        return
+    synthesizer = mms_synthesizer(model, tokenizer)
+    yield synthesizer.synthesize(chunks[0])
+    # The remaining chunks are submitted together and share forward passes
+    futures = [synthesizer.submit(chunk) for chunk in chunks[1:]]
+    for future in futures:
+        yield future.result()
+
+
+def _openai_pcm(text, voice):
+    with get_http_client().slot("openai"), span("openai.speech.create.pcm"):
+        response = get_openai_client().audio.speech.create(
+            model="tts-1",
+            voice=voice,
+            input=text,
+            response_format="pcm",
+        )
+    pcm = np.frombuffer(response.content, dtype="<i2")
+    return pcm.astype(np.float32) / 32768
+
+
+def stream_openai_tts(text, voice="nova", max_workers=4, **split_kwargs):
+    """Yield OpenAI TTS float waveforms (24 kHz) chunk by chunk, in order"""
+    chunks = split_sentences(text, **split_kwargs)
+    if not chunks:
+        return
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="openai-stream")
+    try:
+        futures = [pool.submit(_openai_pcm, chunk, voice) for chunk in chunks]
+        for future in futures:
+            yield future.result()
+    finally:
+        # Stop queued requests if the consumer abandons the stream
+        pool.shutdown(wait=False, cancel_futures=True)
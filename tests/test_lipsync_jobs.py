@@ -0,0 +1,128 @@
+"""Lipsync jobs against a local stand-in for the Gooey.ai async API."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import HttpClient
+from lipsync_jobs import LipsyncJobManager, LipsyncJobStore
+
+
+class GooeyStandIn(BaseHTTPRequestHandler):
+    """Accepts runs and answers status polls by the run's text_prompt:
+
+    "ok" completes on the second poll, "gone" answers 404 and "flaky" answers 503.
+    """
+
+    runs = {}
+    submits = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).submits += 1
+        run_id = f"run-{len(self.runs)}"
+        self.runs[run_id] = {"prompt": payload["text_prompt"], "polls": 0}
+        host, port = self.server.server_address
+        self._send(200, {
+            "run_id": run_id,
+            "status_url": f"http://{host}:{port}/status/{run_id}",
+            "web_url": f"http://{host}:{port}/runs/{run_id}",
+        })
+
+    def do_GET(self):
+        run = self.runs[self.path.rsplit("/", 1)[1]]
+        run["polls"] += 1
+        if run["prompt"] == "gone":
+            self._send(404, {"detail": "run not found"})
+        elif run["prompt"] == "flaky":
+            self._send(503, {"detail": "try again"})
+        elif run["polls"] < 2:
+            self._send(200, {"status": "running"})
+        else:
+            self._send(200, {"status": "completed", "output": {"output_video": "http://videos/out.mp4"}})
+
+
+@pytest.fixture
+def manager(tmp_path):
+    GooeyStandIn.runs = {}
+    GooeyStandIn.submits = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GooeyStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    yield LipsyncJobManager(
+        "test-key",
+        base_url=f"http://{host}:{port}",
+        store=LipsyncJobStore(str(tmp_path / "jobs.sqlite3")),
+        http=HttpClient(max_retries=1, backoff_base=0.01),
+    )
+    server.shutdown()
+
+
+def poll_now(manager, job_id):
+    manager.poll(manager.get(job_id))
+    return manager.get(job_id)
+
+
+def test_job_completes_with_output_url(manager):
+    job_id = manager.submit({"text_prompt": "ok"})
+    assert manager.get(job_id)["status"] == "starting"
+    assert poll_now(manager, job_id)["status"] == "running"
+    job = poll_now(manager, job_id)
+    assert job["status"] == "completed"
+    assert job["output_url"] == "http://videos/out.mp4"
+
+
+def test_status_404_fails_the_job(manager):
+    job_id = manager.submit({"text_prompt": "gone"})
+    job = poll_now(manager, job_id)
+    assert job["status"] == "failed"
+    assert "404" in job["detail"]
+
+
+def test_status_503_keeps_polling(manager):
+    job_id = manager.submit({"text_prompt": "flaky"})
+    job = poll_now(manager, job_id)
+    assert job["status"] == "starting"
+    assert job["next_poll_at"] > time.time()
+
+
+def test_submit_is_sent_once(manager):
+    manager.submit({"text_prompt": "ok"})
+    assert GooeyStandIn.submits == 1
+
+
+def test_expire_fails_jobs_that_cannot_finish(manager):
+    store = manager.store
+    crashed = store.create()
+    unfollowable = store.create()
+    store.update(unfollowable, status="starting")
+    old = manager.submit({"text_prompt": "flaky"})
+
+    store.expire(now=time.time() + 3600 * 2, max_age=3600)
+
+    for job_id in (crashed, unfollowable, old):
+        assert store.get(job_id)["status"] == "failed"
+    assert store.get(crashed)["detail"] == "The submission did not complete"
+    assert store.get(unfollowable)["detail"] == "Gooey returned no status URL to follow"
+    assert store.get(old)["detail"] == "No result after 60 minutes"
+
+
+def test_expire_leaves_fresh_jobs_alone(manager):
+    submitting = manager.store.create()
+    running = manager.submit({"text_prompt": "flaky"})
+    manager.store.expire()
+    assert manager.get(submitting)["status"] == "submitting"
+    assert manager.get(running)["status"] == "starting"
@@ -0,0 +1,107 @@
+"""Segmentation of Hebrew and English text into speakable chunks.
+
+Text is cut at sentence terminators first, then at clause boundaries when a
+sentence is still too long, and finally between words. split_sentences works
+on a complete text; iter_sentences does the same incrementally over a stream
+of text fragments such as chat completion tokens.
+"""
+import re
+
+DEFAULT_MAX_CHARS = 220
+DEFAULT_FIRST_MAX_CHARS = 90
+
+# Sentence terminators, including the Hebrew sof pasuq, optionally followed by
+# closing quotes (including gershayim) or brackets.
+_SENTENCE_END = re.compile(r"[.!?…׃]+[\"'”״)\]]*(?=\s|$)|\n+")
+# Clause boundaries used to split sentences that are still too long.
+_CLAUSE_END = re.compile(r"[,;:،]+(?=\s)|\s[–—-]\s")
+
+
+def _split_at(pattern, text):
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        piece = text[start:match.end()].strip()
+        if piece:
+            pieces.append(piece)
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        pieces.append(tail)
+    return pieces
+
+
+def _split_words(text, max_chars):
+    pieces = []
+    current = ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _pack(pieces, max_chars):
+    """Merge consecutive short pieces so that chunks approach max_chars"""
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def split_sentences(text, max_chars=DEFAULT_MAX_CHARS, first_max_chars=DEFAULT_FIRST_MAX_CHARS):
+    """Segment text into speakable chunks at sentence, then clause, then word boundaries"""
+    pieces = []
+    for sentence in _split_at(_SENTENCE_END, text):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        for clause in _split_at(_CLAUSE_END, sentence):
+            if len(clause) <= max_chars:
+                pieces.append(clause)
+            else:
+                pieces.extend(_split_words(clause, max_chars))
+
+    if not pieces:
+        return []
+
+    # Keep the first chunk short so playback can start quickly
+    first = pieces[0]
+    rest = pieces[1:]
+    if len(first) > first_max_chars:
+        head = _split_at(_CLAUSE_END, first)
+        if len(head) == 1:
+            head = _split_words(first, first_max_chars)
+        first, rest = head[0], head[1:] + rest
+    return [first] + _pack(rest, max_chars)
+
+
+def iter_sentences(fragments, max_chars=DEFAULT_MAX_CHARS, first_max_chars=DEFAULT_FIRST_MAX_CHARS):
+    """Yield speakable chunks from a stream of text fragments as soon as each is complete"""
+    buffer = ""
+    limit = first_max_chars
+    for fragment in fragments:
+        buffer += fragment
+        while True:
+            # A terminator only counts once the text after it has started
+            end = next((m.end() for m in _SENTENCE_END.finditer(buffer) if m.end() < len(buffer)), None)
+            if end is None and len(buffer) > limit:
+                # No sentence end yet; fall back to the last clause boundary or space
+                clauses = [m.end() for m in _CLAUSE_END.finditer(buffer, 0, limit)]
+                end = clauses[-1] if clauses else buffer.rfind(" ", 0, limit) + 1 or limit
+            if end is None:
+                break
+            chunk, buffer = buffer[:end].strip(), buffer[end:]
+            if chunk:
+                yield chunk
+                limit = max_chars
+    tail = buffer.strip()
+    if tail:
+        yield tail
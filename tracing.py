@@ -0,0 +1,239 @@
+"""Lightweight span timing, histograms and a local metrics endpoint.
+
+Hot-path stages are wrapped in `with span("stage"):`. Each span name keeps a
+fixed-bucket histogram (for Prometheus) and a bounded window of recent
+durations (for percentiles), so memory stays flat however long the process
+runs. Every Streamlit session lives in one process, so the figures cover
+all users.
+
+start_metrics_server() serves them on 127.0.0.1 (METRICS_PORT, default 9464,
+0 disables): /metrics in Prometheus text format, /metrics.json as JSON, and
+/profile, the folded stacks collected by the sampling profiler, which
+/profile/start and /profile/stop (or TRACE_PROFILE=1) switch on and off.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9464"))
+RECENT_WINDOW = 1024
+# Upper bounds in seconds, from tokenization up to full lipsync renders
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+PROFILE_INTERVAL = float(os.environ.get("TRACE_PROFILE_INTERVAL_MS", "10")) / 1000
+PROFILE_MAX_STACKS = 5000
+PROFILE_MAX_DEPTH = 64
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Histogram:
+    """Fixed buckets plus a bounded window of recent observations"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self.recent = deque(maxlen=RECENT_WINDOW)
+
+    def observe(self, seconds, error=False):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.errors += error
+        self.recent.append(seconds)
+
+
+class Tracer:
+    """Process-wide registry of span histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, name, seconds, error=False):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds, error)
+
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block and record it under name, flagging exceptions"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(name, time.perf_counter() - start, error=True)
+            raise
+        self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Count, errors, total and p50/p95/p99 in milliseconds per span"""
+        with self._lock:
+            items = [(name, h.count, h.errors, h.sum, sorted(h.recent)) for name, h in self._histograms.items()]
+        return {
+            name: {
+                "count": count,
+                "errors": errors,
+                "total_s": total,
+                "p50_ms": _percentile(recent, 0.50) * 1000,
+                "p95_ms": _percentile(recent, 0.95) * 1000,
+                "p99_ms": _percentile(recent, 0.99) * 1000,
+            }
+            for name, count, errors, total, recent in sorted(items)
+        }
+
+    def prometheus(self):
+        """Render every histogram in the Prometheus text exposition format"""
+        with self._lock:
+            items = [(name, list(h.counts), h.count, h.sum, h.errors) for name, h in self._histograms.items()]
+        lines = [
+            "# HELP tts_span_seconds Duration of instrumented stages",
+            "# TYPE tts_span_seconds histogram",
+        ]
+        for name, counts, count, total, _ in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'tts_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'tts_span_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'tts_span_seconds_sum{{span="{name}"}} {total}')
+            lines.append(f'tts_span_seconds_count{{span="{name}"}} {count}')
+        lines.append("# HELP tts_span_errors_total Spans that ended with an exception")
+        lines.append("# TYPE tts_span_errors_total counter")
+        for name, _, _, _, errors in sorted(items):
+            lines.append(f'tts_span_errors_total{{span="{name}"}} {errors}')
+        return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed interval and counts folded stacks"""
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if not self.running:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._sample, name="trace-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack = ";".join(reversed(names))
+                with self._lock:
+                    self.samples += 1
+                    if stack in self.stacks or len(self.stacks) < PROFILE_MAX_STACKS:
+                        self.stacks[stack] += 1
+
+    def folded(self):
+        """Stacks in the folded format flamegraph tools read, busiest first"""
+        with self._lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+
+
+_tracer = Tracer()
+_profiler = SamplingProfiler()
+
+
+def get_tracer():
+    return _tracer
+
+
+def get_profiler():
+    return _profiler
+
+
+def span(name):
+    """Time a block under name in the process-wide tracer"""
+    return _tracer.span(name)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type):
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(_tracer.prometheus(), "text/plain; version=0.0.4")
+        elif self.path == "/metrics.json":
+            self._send(json.dumps(_tracer.snapshot()), "application/json")
+        elif self.path == "/profile":
+            self._send(_profiler.folded(), "text/plain")
+        elif self.path == "/profile/start":
+            _profiler.reset()
+            _profiler.start()
+            self._send("profiling\n", "text/plain")
+        elif self.path == "/profile/stop":
+            _profiler.stop()
+            self._send(f"stopped after {_profiler.samples} samples\n", "text/plain")
+        else:
+            self.send_error(404)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve the metrics endpoint once per process; return its port, or None if disabled"""
+    global _server
+    with _server_lock:
+        if _server is None and port:
+            try:
+                _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            except OSError:
+                # Another process (e.g. a second app instance) already serves this port
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            if os.environ.get("TRACE_PROFILE") == "1":
+                _profiler.start()
+        return _server.server_address[1] if _server else None
@@ -0,0 +1,192 @@
+"""Persistent, content-addressed cache for synthesized audio.
+
+Entries are keyed by a SHA-256 of the normalized text plus every synthesis
+parameter. Audio bytes live on disk under a size-bounded LRU and the most
+recently used entries are also kept in a small in-memory hot tier, so a
+repeated request skips the API round trip or the VITS forward pass entirely.
+"""
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from tracing import span
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TTS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tts"),
+)
+DEFAULT_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_MB", "512")) * 1024 * 1024
+DEFAULT_HOT_ENTRIES = int(os.environ.get("TTS_CACHE_HOT_ENTRIES", "32"))
+
+
+def normalize_text(text):
+    """Normalize text so that trivially different inputs share a cache entry"""
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split())
+
+
+def cache_key(backend, text, **params):
+    """Build a cache key from the backend name, normalized text and parameters"""
+    payload = json.dumps(
+        {"backend": backend, "text": normalize_text(text), "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Two-tier LRU cache: a bounded in-memory tier in front of a bounded disk tier"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 hot_entries=DEFAULT_HOT_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hot_entries = hot_entries
+        self._lock = threading.Lock()
+        self._hot = OrderedDict()
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".audio")
+
+    def _load_index(self):
+        """Rebuild the LRU order from file modification times"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".audio"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-len(".audio")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def get(self, key):
+        """Return cached bytes for key, or None on a miss"""
+        with self._lock:
+            data = self._hot.get(key)
+            if data is not None:
+                self._hot.move_to_end(key)
+                if key in self._index:
+                    self._index.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return data
+
+        path = self._path(key)
+        try:
+            with span("cache.disk_read"):
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                except FileNotFoundError:
+                    # An ordinary miss; only real I/O failures mark the span as errored
+                    data = None
+            if data is not None:
+                os.utime(path)
+        except OSError:
+            data = None
+        if data is None:
+            with self._lock:
+                self._counters["misses"] += 1
+            return None
+
+        with self._lock:
+            if key not in self._index:
+                self._index[key] = len(data)
+                self._total_bytes += len(data)
+            self._index.move_to_end(key)
+            self._remember_locked(key, data)
+            self._counters["disk_hits"] += 1
+        return data
+
+    def put(self, key, data):
+        """Store bytes under key and evict least recently used entries if needed"""
+        data = bytes(data)
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with span("cache.disk_write"):
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            self._remember_locked(key, data)
+            self._counters["writes"] += 1
+            self._evict_locked()
+
+    def _remember_locked(self, key, data):
+        self._hot[key] = data
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_entries:
+            self._hot.popitem(last=False)
+
+    def _evict_locked(self):
+        while self._total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._hot.pop(key, None)
+            self._total_bytes -= size
+            self._counters["evictions"] += 1
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove every entry from both tiers"""
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    os.unlink(self._path(key))
+                except OSError:
+                    pass
+            self._index.clear()
+            self._hot.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and current occupancy"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._index)
+            stats["bytes"] = self._total_bytes
+            stats["hot_entries"] = len(self._hot)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """Return the process-wide cache shared by every page and session"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AudioCache()
+        return _cache
@@ -0,0 +1,234 @@
+"""Streamlit-free speech synthesis for the OpenAI and MMS-TTS backends.
+
+The pages, the batch CLI and the benchmarks all synthesize through these
+functions. Importing the module has no UI side effects and does not import
+torch or transformers; those are only loaded by the MMS runtime once the MMS
+backend is actually used. Failures raise TTSError instead of writing to the
+page, so each caller decides how to report them. Identical requests that are
+in flight at the same time, from any session, are coalesced into one call.
+When MMS_SERVER_ADDRESS is set, MMS inference runs on the shared mms_server
+instead of a model loaded in this process.
+"""
+import base64
+import os
+
+from audio_result import AudioResult
+from http_client import get_http_client, get_openai_client
+from mms_batcher import get_batcher
+from mms_runtime import get_mms_runtime
+from mms_server import get_mms_client
+from singleflight import get_singleflight
+from tracing import span
+from tts_cache import cache_key, get_audio_cache
+
+OPENAI_SAMPLE_RATE = 24000
+# Post-processed audio from every backend is resampled to this rate; 0 keeps each backend's own rate
+OUTPUT_SAMPLE_RATE = int(os.environ.get("TTS_OUTPUT_SAMPLE_RATE", str(OPENAI_SAMPLE_RATE))) or None
+
+
+class TTSError(Exception):
+    """Raised when a backend fails to synthesize speech"""
+
+    def __init__(self, message, backend=None):
+        super().__init__(message)
+        self.backend = backend
+
+
+class ModelLoadError(TTSError):
+    """Raised when the MMS model cannot be loaded"""
+
+
+def _postprocess_pcm(pcm_bytes, codec, backend):
+    """Give OpenAI's raw 16-bit PCM the MMS post-processing and encode it as codec"""
+    import numpy as np
+
+    from audio_codecs import encode
+    from audio_post import postprocess
+
+    try:
+        samples = np.frombuffer(pcm_bytes, dtype="<i2").astype(np.float32) / 32768
+        with span("audio.postprocess"):
+            audio_np, rate = postprocess(samples, OPENAI_SAMPLE_RATE, target_rate=OUTPUT_SAMPLE_RATE)
+        with span(f"audio.encode.{codec}"):
+            encoded, _ = encode(audio_np, rate, codec)
+    except Exception as e:
+        raise TTSError(f"Error encoding {backend} audio as {codec}: {e}", backend=backend) from e
+    return AudioResult(encoded, rate, codec)
+
+
+def _postprocessed_key(codec):
+    """Cache key fields for audio post-processed and encoded as codec"""
+    from audio_post import DEFAULT_TARGET_LUFS
+
+    return {"codec": codec, "sampling_rate": OUTPUT_SAMPLE_RATE, "target_lufs": DEFAULT_TARGET_LUFS}
+
+
+def openai_tts(text, voice="nova", use_cache=True, response_format="mp3", codec=None):
+    """Convert text to speech using OpenAI's basic TTS API
+
+    response_format picks the encoding OpenAI returns (mp3, opus, flac or wav).
+    With a codec, the audio is fetched as raw PCM instead and gets the same
+    trimming, resampling and loudness normalization as MMS output before it
+    is encoded as codec, so backends can be compared like for like.
+    """
+    audio_cache = get_audio_cache()
+    if codec:
+        response_format = "pcm"
+        key = cache_key("openai_tts", text, model="tts-1", voice=voice, **_postprocessed_key(codec))
+    else:
+        key = cache_key("openai_tts", text, model="tts-1", voice=voice, response_format=response_format)
+    if use_cache:
+        cached = audio_cache.get(key)
+        if cached is not None:
+            if codec:
+                return AudioResult(cached, OUTPUT_SAMPLE_RATE or OPENAI_SAMPLE_RATE, codec, cached=True)
+            return AudioResult(cached, OPENAI_SAMPLE_RATE, response_format, cached=True)
+
+    def synthesize():
+        try:
+            with get_http_client().slot("openai"), span("openai.speech.create"):
+                response = get_openai_client().audio.speech.create(
+                    model="tts-1",
+                    voice=voice,
+                    input=text,
+                    response_format=response_format,
+                )
+        except Exception as e:
+            raise TTSError(f"Error generating speech with OpenAI TTS: {e}", backend="openai_tts") from e
+
+        if codec:
+            result = _postprocess_pcm(response.content, codec, "openai_tts")
+        else:
+            result = AudioResult(response.content, OPENAI_SAMPLE_RATE, response_format)
+        if use_cache:
+            audio_cache.put(key, result.data)
+        return result
+
+    # Identical requests from other sessions share this call
+    return get_singleflight().do(key, synthesize)
+
+
+def openai_chat_tts(text, system_prompt, use_cache=True, codec=None):
+    """Convert text to speech using OpenAI's Chat Completions TTS
+
+    The reply is mp3, or, with a codec, post-processed and encoded like openai_tts.
+    """
+    audio_cache = get_audio_cache()
+    fields = _postprocessed_key(codec) if codec else {}
+    key = cache_key("openai_chat_tts", text, model="gpt-4o-audio-preview",
+                    voice="alloy", system_prompt=system_prompt, **fields)
+    if use_cache:
+        cached = audio_cache.get(key)
+        if cached is not None:
+            if codec:
+                return AudioResult(cached, OUTPUT_SAMPLE_RATE or OPENAI_SAMPLE_RATE, codec, cached=True)
+            return AudioResult(cached, OPENAI_SAMPLE_RATE, "mp3", cached=True)
+
+    def synthesize():
+        try:
+            with get_http_client().slot("openai"), span("openai.chat.create"):
+                completion = get_openai_client().chat.completions.create(
+                    model="gpt-4o-audio-preview",
+                    modalities=["text", "audio"],
+                    audio={"voice": "alloy", "format": "pcm16" if codec else "mp3"},
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": system_prompt,
+                        },
+                        {
+                            "role": "user",
+                            "content": text,
+                        }
+                    ],
+                )
+            # Decode the audio
+            audio_bytes = base64.b64decode(completion.choices[0].message.audio.data)
+        except Exception as e:
+            raise TTSError(f"Error generating speech with OpenAI Chat TTS: {e}", backend="openai_chat_tts") from e
+
+        if codec:
+            result = _postprocess_pcm(audio_bytes, codec, "openai_chat_tts")
+        else:
+            result = AudioResult(audio_bytes, OPENAI_SAMPLE_RATE, "mp3")
+        if use_cache:
+            audio_cache.put(key, result.data)
+        return result
+
+    return get_singleflight().do(key, synthesize)
+
+
+def load_mms_model(timeout=None):
+    """Return the MMS-TTS model and tokenizer, waiting for the background load if needed"""
+    try:
+        return get_mms_runtime().wait(timeout)
+    except Exception as e:
+        raise ModelLoadError(f"Error loading MMS model: {e}", backend="mms") from e
+
+
+def mms_synthesizer(model=None, tokenizer=None, timeout=None):
+    """Return what runs MMS inference: the given model's batcher, the shared server, or the local model
+
+    Both kinds offer submit(), synthesize(), normalize(), sampling_rate and model_id.
+    """
+    if model is None:
+        client = get_mms_client()
+        if client is not None:
+            try:
+                client.info()
+            except Exception as e:
+                raise ModelLoadError(f"Error connecting to the MMS server: {e}", backend="mms") from e
+            return client
+        model, tokenizer = load_mms_model(timeout)
+    return get_batcher(model, tokenizer)
+
+
+def mms_tts(text, model=None, tokenizer=None, use_cache=True, codec=None):
+    """Convert text to speech using MMS-TTS, encoded as codec (see audio_codecs)
+
+    Without a model, synthesis goes to the MMS server if one is configured.
+    """
+    from audio_codecs import DEFAULT_CODEC, encode
+    from audio_post import DEFAULT_TARGET_LUFS, postprocess
+
+    codec = codec or DEFAULT_CODEC
+
+    audio_cache = get_audio_cache()
+    synthesizer = mms_synthesizer(model, tokenizer)
+    sample_rate = OUTPUT_SAMPLE_RATE or synthesizer.sampling_rate
+    try:
+        normalized = synthesizer.normalize(text)
+    except Exception as e:
+        raise TTSError(f"Error normalizing text for MMS-TTS: {e}", backend="mms") from e
+    # Inputs differing only in niqqud, digits or stray symbols share an entry
+    key = cache_key("mms_tts", normalized, model=synthesizer.model_id,
+                    sampling_rate=sample_rate, target_lufs=DEFAULT_TARGET_LUFS, codec=codec)
+    if use_cache:
+        cached = audio_cache.get(key)
+        if cached is not None:
+            return AudioResult(cached, sample_rate, codec, cached=True)
+
+    def synthesize():
+        try:
+            # Concurrent requests are batched into one forward pass per length bucket
+            with span("mms.synthesize"):
+                waveform = synthesizer.synthesize(text)
+        except Exception as e:
+            raise TTSError(f"Error generating speech with MMS-TTS: {e}", backend="mms") from e
+
+        # Trim silence, resample and normalize loudness before the peak-safe int16 conversion
+        with span("audio.postprocess"):
+            audio_np, rate = postprocess(waveform, synthesizer.sampling_rate,
+                                          target_rate=OUTPUT_SAMPLE_RATE)
+        # The batcher has already handed the waveform back, so encoding here
+        # does not delay its next forward pass
+        try:
+            with span(f"audio.encode.{codec}"):
+                encoded, _ = encode(audio_np, rate, codec)
+        except Exception as e:
+            raise TTSError(f"Error encoding MMS-TTS audio as {codec}: {e}", backend="mms") from e
+        if use_cache:
+            audio_cache.put(key, encoded)
+        return AudioResult(encoded, rate, codec)
+
+    return get_singleflight().do(key, synthesize)
@@ -0,0 +1,223 @@
+"""Registry of TTS backends behind one async interface.
+
+Every backend exposes `synthesize(text, **options)`, returning an
+AudioResult, and, where it can, `synthesize_stream(text, **options)`, an
+async iterator of float waveforms at the backend's sample rate. Each one
+declares its capabilities together with cost and latency hints, which the
+router (tts_router) uses to pick a backend in "Auto" mode. The blocking
+synthesis calls run on worker threads and share the process-wide pooled
+clients and audio cache. Streamlit pages, which run synchronously, call
+the backends through synthesize_sync and stream_sync, which run them on
+one long-lived event loop.
+
+The voice and speaking-style presets used by the pages live here too.
+"""
+import asyncio
+import threading
+from dataclasses import dataclass
+
+from tts_engine import OPENAI_SAMPLE_RATE, mms_tts, openai_chat_tts, openai_tts
+
+VOICE_OPTIONS = {
+    "Nova (Female)": "nova",
+    "Alloy (Neutral)": "alloy",
+    "Echo (Male)": "echo",
+    "Fable (Male)": "fable",
+    "Onyx (Male)": "onyx",
+    "Shimmer (Female)": "shimmer"
+}
+
+PRESET_PROMPTS = {
+    "British Teacher": "You are a helpful assistant that speaks in a British accent and enunciates like you're talking to a child.",
+    "Fast Speaker": "You are a helpful assistant that speaks in a British accent and speaks really fast.",
+    "Hebrew Speaker": "You are a helpful female cheerful assistant that speaks in a correct Hebrew accent and enunciates like you're talking to a child.",
+    "Custom": "Custom prompt..."
+}
+
+@dataclass(frozen=True)
+class BackendInfo:
+    """Capabilities and cost/latency hints a backend declares"""
+    name: str
+    label: str
+    sample_rate: int
+    languages: tuple = ("he", "en")
+    voices: tuple = ()
+    streaming: bool = False
+    system_prompt: bool = False
+    local: bool = False
+    # USD per 1,000 input characters; 0 for local inference
+    cost_per_1k_chars: float = 0.0
+    # Typical seconds to the first audio for a short sentence; the router's
+    # prior until it has observed the backend (tts_router.BackendStats)
+    latency_hint: float = 1.0
+
+
+class TTSBackend:
+    """Base class for registered backends; subclasses implement _synthesize"""
+
+    info = None
+
+    def supports(self, language=None, voice=None, streaming=False, system_prompt=False):
+        info = self.info
+        return ((language is None or language in info.languages)
+                and (voice is None or voice in info.voices)
+                and (info.streaming or not streaming)
+                and (info.system_prompt or not system_prompt))
+
+    def estimated_cost(self, text):
+        return self.info.cost_per_1k_chars * len(text) / 1000
+
+    async def synthesize(self, text, **options):
+        """Synthesize text and return an AudioResult"""
+        return await asyncio.to_thread(self._synthesize, text, **options)
+
+    async def synthesize_stream(self, text, **options):
+        """Yield float waveforms chunk by chunk, in order"""
+        if not self.info.streaming:
+            raise NotImplementedError(f"{self.info.label} does not support streaming")
+        chunks = self._stream(text, **options)
+        done = object()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, done)
+                if chunk is done:
+                    break
+                yield chunk
+        finally:
+            # A cancelled consumer may leave the generator running on its thread
+            if not chunks.gi_running:
+                chunks.close()
+
+    def _synthesize(self, text, **options):
+        raise NotImplementedError
+
+    def _stream(self, text, **options):
+        raise NotImplementedError
+
+
+class OpenAITTSBackend(TTSBackend):
+    info = BackendInfo(
+        name="openai_tts",
+        label="OpenAI TTS",
+        sample_rate=OPENAI_SAMPLE_RATE,
+        voices=tuple(VOICE_OPTIONS.values()),
+        streaming=True,
+        cost_per_1k_chars=0.015,
+        latency_hint=1.0,
+    )
+
+    def _synthesize(self, text, voice="nova", use_cache=True, response_format="mp3", codec=None):
+        return openai_tts(text, voice=voice, use_cache=use_cache, response_format=response_format, codec=codec)
+
+    def _stream(self, text, voice="nova"):
+        from streaming_tts import stream_openai_tts
+
+        return stream_openai_tts(text, voice=voice)
+
+
+class OpenAIChatTTSBackend(TTSBackend):
+    info = BackendInfo(
+        name="openai_chat_tts",
+        label="OpenAI Chat TTS",
+        sample_rate=OPENAI_SAMPLE_RATE,
+        voices=("alloy",),
+        system_prompt=True,
+        cost_per_1k_chars=0.1,
+        latency_hint=3.0,
+    )
+
+    def _synthesize(self, text, system_prompt=PRESET_PROMPTS["Hebrew Speaker"], use_cache=True, codec=None):
+        return openai_chat_tts(text, system_prompt, use_cache=use_cache, codec=codec)
+
+
+class MMSBackend(TTSBackend):
+    info = BackendInfo(
+        name="mms",
+        label="MMS-TTS",
+        sample_rate=16000,
+        languages=("he",),
+        streaming=True,
+        local=True,
+        latency_hint=0.5,
+    )
+
+    def _synthesize(self, text, use_cache=True, codec=None):
+        # Uses the MMS server when one is configured, else the in-process model
+        return mms_tts(text, use_cache=use_cache, codec=codec)
+
+    def _stream(self, text):
+        from streaming_tts import stream_mms
+
+        return stream_mms(text)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop():
+    """Return the long-lived event loop that synchronous callers run backends on"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="tts-registry-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine on the shared event loop and wait for its result
+
+    Unlike asyncio.run, returning does not wait for worker threads the
+    coroutine left behind, such as a hedged-out backend call.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
+
+
+def register_backend(backend):
+    """Add a backend to the registry, replacing any backend with the same name"""
+    with _backends_lock:
+        _backends[backend.info.name] = backend
+    return backend
+
+
+def get_backend(name):
+    with _backends_lock:
+        try:
+            return _backends[name]
+        except KeyError:
+            raise KeyError(f"Unknown TTS backend {name!r}") from None
+
+
+def list_backends():
+    with _backends_lock:
+        return list(_backends.values())
+
+
+def synthesize_sync(name, text, **options):
+    """Synthesize text with the named backend from synchronous code"""
+    return run_sync(get_backend(name).synthesize(text, **options))
+
+
+async def _next_chunk(chunks):
+    return await chunks.__anext__()
+
+
+def stream_sync(name, text, **options):
+    """Iterate the named backend's synthesize_stream from synchronous code"""
+    chunks = get_backend(name).synthesize_stream(text, **options)
+    try:
+        while True:
+            try:
+                yield run_sync(_next_chunk(chunks))
+            except StopAsyncIteration:
+                return
+    finally:
+        run_sync(chunks.aclose())
+
+
+register_backend(OpenAITTSBackend())
+register_backend(OpenAIChatTTSBackend())
+register_backend(MMSBackend())
@@ -0,0 +1,309 @@
+"""Latency-aware routing across the registered TTS backends ("Auto" mode).
+
+The router keeps a rolling window of recent outcomes per backend: latency
+together with the text length it was measured on, and errors. For each
+request it estimates, per backend, the probability of finishing within the
+latency target, scaling past latencies to the new text's length, and starts
+the most likely backend; among backends that are about equally likely, the
+cheaper one wins. Until a backend has enough history, its declared latency
+hint stands in as a few prior samples.
+
+If the chosen backend has not answered by its own p95 estimate (capped at
+the target), the next-ranked backend is started as a hedge and whichever
+finishes first is used; the losing call is recorded once it really
+finishes, so the statistics never mistake an abandoned call for a fast
+one. A failed call moves straight on to the next backend, and a backend
+that fails several times in a row is skipped for a cool-down period.
+Local MMS is always the last resort, so a network outage still produces
+audio.
+
+Every request yields a RouteDecision listing the candidates with their
+estimates, each attempt with its outcome, and the winner; the most recent
+decisions are kept for debugging.
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from functools import partial
+
+from tracing import span
+from tts_engine import TTSError
+from tts_registry import list_backends
+
+LATENCY_TARGET = float(os.environ.get("TTS_LATENCY_TARGET", "3.0"))
+STATS_WINDOW = 50
+# Outcomes older than this no longer describe the backend
+STATS_MAX_AGE = 600.0
+# Latency is modelled as fixed overhead plus a per-character share
+OVERHEAD_CHARS = 100
+PRIOR_SAMPLES = 3
+PRIOR_CHARS = 100
+HEDGE_QUANTILE = 0.95
+MIN_HEDGE_DELAY = 0.25
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN = 30.0
+DECISION_HISTORY = 50
+
+_HEBREW = re.compile(r"[\u0590-\u05FF]")
+
+
+class RoutingError(TTSError):
+    """Raised when no backend could synthesize a routed request"""
+
+    def __init__(self, message, decision):
+        super().__init__(message, backend="auto")
+        self.decision = decision
+
+
+def detect_language(text):
+    return "he" if _HEBREW.search(text) else "en"
+
+
+def _quantile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class BackendStats:
+    """Rolling latency and error window for one backend, plus a failure breaker"""
+
+    def __init__(self, latency_hint):
+        self.latency_hint = latency_hint
+        self._samples = deque(maxlen=STATS_WINDOW)
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.cache_hits = 0
+
+    def record_cache_hit(self):
+        """Count a call answered from the audio cache; it says nothing about synthesis latency"""
+        with self._lock:
+            self.cache_hits += 1
+
+    def record(self, seconds, chars, ok):
+        """Add the outcome of a finished call"""
+        now = time.time()
+        with self._lock:
+            self._samples.append((now, seconds, chars, ok))
+            if ok:
+                self.consecutive_failures = 0
+                self.open_until = 0.0
+            else:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= BREAKER_FAILURES:
+                    self.open_until = now + BREAKER_COOLDOWN
+
+    @property
+    def available(self):
+        """False while the breaker is open; after the cool-down one trial call is let through"""
+        return time.time() >= self.open_until
+
+    def estimate(self, chars, target):
+        """Probability of finishing within target for a text of chars, and latency quantiles"""
+        cutoff = time.time() - STATS_MAX_AGE
+        with self._lock:
+            samples = [(s, c, ok) for t, s, c, ok in self._samples if t >= cutoff]
+        prior = [(self.latency_hint, PRIOR_CHARS, True)] * PRIOR_SAMPLES
+        scaled = [
+            (seconds * (chars + OVERHEAD_CHARS) / (sample_chars + OVERHEAD_CHARS), ok)
+            for seconds, sample_chars, ok in prior + samples
+        ]
+        latencies = sorted(seconds for seconds, ok in scaled if ok)
+        failures = sum(not ok for _, _, ok in samples)
+        return {
+            "p_meet": sum(ok and seconds <= target for seconds, ok in scaled) / len(scaled),
+            "p50_s": _quantile(latencies, 0.5),
+            "p95_s": _quantile(latencies, HEDGE_QUANTILE),
+            "error_rate": failures / len(samples) if samples else 0.0,
+            "samples": len(samples),
+        }
+
+
+@dataclass
+class RouteDecision:
+    """Why a request went where it went, for display and debugging"""
+    chars: int
+    language: str
+    latency_target: float
+    candidates: list = field(default_factory=list)
+    attempts: list = field(default_factory=list)
+    winner: str = None
+    hedged: bool = False
+    fell_back: bool = False
+    total_seconds: float = None
+
+    def as_dict(self):
+        return asdict(self)
+
+
+class TTSRouter:
+    """Routes each request to the backend most likely to meet a latency target"""
+
+    def __init__(self, latency_target=LATENCY_TARGET):
+        self.latency_target = latency_target
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._decisions = deque(maxlen=DECISION_HISTORY)
+
+    def stats_for(self, backend):
+        with self._lock:
+            stats = self._stats.get(backend.info.name)
+            if stats is None:
+                stats = self._stats[backend.info.name] = BackendStats(backend.info.latency_hint)
+            return stats
+
+    def rank(self, text, decision, allow_remote=True):
+        """Order the eligible backends best first, recording every candidate in decision"""
+        eligible = []
+        for backend in list_backends():
+            stats = self.stats_for(backend)
+            estimate = stats.estimate(decision.chars, decision.latency_target)
+            candidate = dict(estimate, backend=backend.info.name, cost_usd=backend.estimated_cost(text))
+            if not backend.supports(decision.language):
+                candidate["skipped"] = f"does not support {decision.language}"
+            elif not (allow_remote or backend.info.local):
+                candidate["skipped"] = "remote backends disabled"
+            elif not stats.available:
+                candidate["skipped"] = f"{stats.consecutive_failures} consecutive failures"
+            else:
+                eligible.append((backend, candidate))
+            decision.candidates.append(candidate)
+
+        # Backends about equally likely to meet the target compete on cost, then speed
+        eligible.sort(key=lambda item: (-round(item[1]["p_meet"], 1), item[1]["cost_usd"],
+                                        item[1]["p50_s"] or 0.0))
+        order = [backend for backend, _ in eligible]
+        # Local inference is the last resort even while its breaker is open
+        for backend in list_backends():
+            if backend.info.local and backend not in order and backend.supports(decision.language):
+                order.append(backend)
+        return order
+
+    def hedge_delay(self, backend, decision):
+        """Seconds to wait on backend before starting a second one"""
+        estimate = self.stats_for(backend).estimate(decision.chars, decision.latency_target)
+        p95 = estimate["p95_s"] or decision.latency_target
+        return max(MIN_HEDGE_DELAY, min(p95, decision.latency_target))
+
+    async def route(self, text, latency_target=None, options=None, language=None, allow_remote=True,
+                    hedge=True):
+        """Synthesize text on the best backend; return (AudioResult, RouteDecision)
+
+        options maps backend names to keyword arguments for that backend,
+        e.g. {"openai_tts": {"voice": "nova"}, "mms": {"codec": "flac"}}.
+        """
+        options = options or {}
+        decision = RouteDecision(
+            chars=len(text),
+            language=language or detect_language(text),
+            latency_target=latency_target or self.latency_target,
+        )
+        order = self.rank(text, decision, allow_remote)
+        if not order:
+            self._decisions.append(decision)
+            raise RoutingError(f"No TTS backend can serve {decision.language} text", decision)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        running = {}
+        remaining = list(order)
+        errors = []
+
+        def launch(role):
+            backend = remaining.pop(0)
+            attempt = {"backend": backend.info.name, "role": role, "started_s": loop.time() - start}
+            decision.attempts.append(attempt)
+            task = asyncio.ensure_future(backend.synthesize(text, **options.get(backend.info.name, {})))
+            running[task] = (backend, attempt)
+            return backend
+
+        primary = launch("primary")
+        hedge_at = start + self.hedge_delay(primary, decision) if hedge and remaining else None
+        try:
+            with span("router.route"):
+                while running:
+                    timeout = None if hedge_at is None else max(0.0, hedge_at - loop.time())
+                    done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        # The deadline passed with nothing back: race a second backend
+                        launch("hedge")
+                        decision.hedged = True
+                        hedge_at = None
+                        continue
+
+                    for task in done:
+                        backend, attempt = running.pop(task)
+                        attempt["seconds"] = self._record(task, backend, decision.chars, start + attempt["started_s"])
+                        error = task.exception()
+                        if error is None:
+                            attempt["outcome"] = "ok"
+                            decision.winner = backend.info.name
+                            return task.result(), decision
+                        attempt["outcome"] = "error"
+                        attempt["error"] = str(error)
+                        errors.append(f"{backend.info.label}: {error}")
+
+                    if not running and remaining:
+                        fallback = launch("fallback")
+                        decision.fell_back = True
+                        if hedge_at is not None:
+                            # The hedge was not used yet; it now covers the fallback
+                            hedge_at = loop.time() + self.hedge_delay(fallback, decision) if remaining else None
+        finally:
+            for task, (backend, attempt) in running.items():
+                # The losing call keeps running and is recorded once it really finishes, so its
+                # latency is not cut short at the moment it lost; its audio still lands in the cache
+                attempt["outcome"] = "abandoned"
+                attempt["seconds"] = loop.time() - start - attempt["started_s"]
+                task.add_done_callback(
+                    partial(self._record, backend=backend, chars=decision.chars, started=start + attempt["started_s"])
+                )
+            decision.total_seconds = loop.time() - start
+            self._decisions.append(decision)
+
+        raise RoutingError("Every TTS backend failed: " + "; ".join(errors), decision)
+
+    def _record(self, task, backend, chars, started):
+        """Record a finished call in its backend's stats and return its latency"""
+        if task.cancelled():
+            # Only happens when the loop shuts down; the call's latency is unknown
+            return None
+        seconds = task.get_loop().time() - started
+        stats = self.stats_for(backend)
+        if task.exception() is None and task.result().cached:
+            stats.record_cache_hit()
+        else:
+            stats.record(seconds, chars, ok=task.exception() is None)
+        return seconds
+
+    def recent_decisions(self, limit=10):
+        return [d.as_dict() for d in list(self._decisions)[-limit:]]
+
+    def stats(self):
+        """Current estimates for a short sentence at the default target, per backend"""
+        return {
+            backend.info.name: dict(
+                self.stats_for(backend).estimate(PRIOR_CHARS, self.latency_target),
+                available=self.stats_for(backend).available,
+                cache_hits=self.stats_for(backend).cache_hits,
+            )
+            for backend in list_backends()
+        }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Return the process-wide router, shared by every session"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = TTSRouter()
+        return _router
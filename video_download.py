@@ -0,0 +1,98 @@
+"""Chunked, resumable download of rendered videos.
+
+The response is streamed in fixed-size chunks into a partial file on disk,
+so memory stays flat regardless of the video size. If the connection drops,
+the download resumes from the bytes already on disk with a Range request.
+The final size is checked against Content-Length before the partial file is
+renamed into place. A video that is already on disk is not fetched again.
+Callers choose where videos go; the lipsync cache keeps them under its size
+cap and expiry.
+"""
+import os
+
+import requests
+
+from http_client import get_http_client
+from tracing import span
+
+CHUNK_SIZE = 1024 * 1024
+MAX_RESUMES = 3
+MAX_VIDEO_BYTES = int(os.environ.get("MAX_VIDEO_MB", "500")) * 1024 * 1024
+
+
+class DownloadError(Exception):
+    """Raised when a download is truncated, oversized or cannot be resumed"""
+
+
+def _total_size(response, offset):
+    """Full size of the resource from Content-Range or Content-Length"""
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    length = response.headers.get("Content-Length")
+    if length is None:
+        return None
+    return int(length) + (offset if response.status_code == 206 else 0)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def download_file(url, path, http=None, chunk_size=CHUNK_SIZE, max_bytes=MAX_VIDEO_BYTES,
+                  max_resumes=MAX_RESUMES):
+    """Stream url to path, resuming interrupted transfers, and return the path"""
+    if os.path.exists(path):
+        return path
+    http = http or get_http_client()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    part_path = path + ".part"
+
+    resumes = 0
+    while True:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        response = http.get(url, provider="gooey", endpoint="video.download", stream=True, headers=headers)
+        try:
+            if response.status_code == 416:
+                # The partial file already holds the whole resource
+                break
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                # The server ignored the Range header; start over
+                offset = 0
+            expected = _total_size(response, offset)
+            if expected is not None and expected > max_bytes:
+                raise DownloadError(f"Video is {expected} bytes, above the {max_bytes} byte limit")
+
+            received = offset
+            with span("video.download"), open(part_path, "ab" if offset else "wb") as f:
+                for chunk in response.iter_content(chunk_size):
+                    received += len(chunk)
+                    if received > max_bytes:
+                        raise DownloadError(f"Video exceeds the {max_bytes} byte limit")
+                    f.write(chunk)
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            resumes += 1
+            if resumes > max_resumes:
+                raise
+            continue
+        except DownloadError:
+            _remove(part_path)
+            raise
+        finally:
+            response.close()
+
+        if expected is not None and received != expected:
+            resumes += 1
+            if resumes > max_resumes:
+                _remove(part_path)
+                raise DownloadError(f"Downloaded {received} of {expected} bytes")
+            continue
+        break
+
+    os.replace(part_path, path)
+    return path